@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The bounds module works out the bounding box of the drawing of an
+L-system without drawing it, so that a window can be fitted to it
+rather than guessing a starting position and step size.
+
+Typical usage of this module is simply as follows:
+
+    from bounds import bounds, fit
+    from examples import Plant
+
+    box = bounds(Plant, 6)
+    fit(win, box)
+
+When every turn is a whole number of steps out of a full turn, as it is
+for every system in `examples`, the extent of what each symbol draws
+after each number of rewrites is worked out once per heading and reused,
+so the program is never walked. Otherwise, the program is streamed
+through a turtle that only keeps track of the box.
+"""
+
+import math
+
+from state import delta, heading_table, turn_steps
+from system import derive
+
+# The largest number of headings for which extents are tabulated
+MAX_STEPS = 1 << 12
+
+def union(a, b):
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return (min(a[0], b[0]), min(a[1], b[1]),
+            max(a[2], b[2]), max(a[3], b[3]))
+
+def shift(box, (x, y)):
+    if box is None:
+        return None
+    return (box[0] + x, box[1] + y, box[2] + x, box[3] + y)
+
+class Extents:
+    """
+    The extent of what each symbol of `lsys` draws after `n` rewrites,
+    for a turtle starting at the origin in each of `steps` headings.
+    Each extent is a tuple (dx, dy, turn, box): where the turtle ends
+    up, by how many steps it turns, and the box (xmin, ymin, xmax, ymax)
+    around the segments drawn, or None if nothing is drawn.
+    """
+
+    def __init__(self, lsys, step_size=4, angle=None, steps=None):
+        if angle is None:
+            angle = getattr(lsys, 'angle', 90)
+        if steps is None:
+            steps = turn_steps(angle)
+        k = angle * steps / 360.0
+        if abs(k - round(k)) > 1e-6:
+            raise ValueError('{} degrees is not a whole number of steps'
+                             .format(angle))
+        self.lsys = lsys
+        self.step_size = step_size
+        self.angle = angle
+        self.steps = steps
+        self.turn = int(round(k))
+        self.table = [(step_size*dx, step_size*dy)
+                      for (dx, dy) in heading_table(steps)]
+        self.cache = {}
+
+    def extent(self, c, n, h):
+        key = (c, n, h)
+        if key in self.cache:
+            return self.cache[key]
+        if n > 0 and c in self.lsys.rules:
+            result = self.walk(self.lsys.rules[c], n-1, h)
+        elif c.isalpha():
+            (dx, dy) = self.table[h]
+            box = None
+            if c.isupper():
+                box = (min(0.0, dx), min(0.0, dy), max(0.0, dx), max(0.0, dy))
+            result = (dx, dy, 0, box)
+        elif c == '+':
+            result = (0.0, 0.0, self.turn, None)
+        elif c == '-':
+            result = (0.0, 0.0, -self.turn, None)
+        else:
+            result = (0.0, 0.0, 0, None)
+        self.cache[key] = result
+        return result
+
+    def walk(self, symbols, n, h):
+        # Combines the extents of `symbols` after `n` rewrites. Brackets
+        # must match within `symbols`, as the state saved by a `[` is
+        # only known here.
+        position = (0.0, 0.0)
+        heading = h
+        box = None
+        stack = []
+        for c in symbols:
+            if c == '[':
+                stack.append((position, heading))
+            elif c == ']':
+                if not stack:
+                    raise ValueError('unbalanced brackets in ' +
+                                     repr(symbols))
+                (position, heading) = stack.pop()
+            else:
+                (dx, dy, turn, b) = self.extent(c, n, heading)
+                box = union(box, shift(b, position))
+                position = (position[0] + dx, position[1] + dy)
+                heading = (heading + turn) % self.steps
+        if stack:
+            raise ValueError('unbalanced brackets in ' + repr(symbols))
+        return (position[0], position[1], (heading - h) % self.steps, box)
+
+    def bounds(self, n, position=(0.0, 0.0), h=0):
+        # The box around the whole drawing after `n` rewrites, for a
+        # turtle starting at `position` in heading `h`.
+        return shift(self.walk(self.lsys.axiom, n, h)[3], position)
+
+def intersects(a, b):
+    # Whether two boxes overlap, counting boxes that only touch
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def viewport(win):
+    # The box of world coordinates visible in `win`
+    (x1, y1) = win.toWorld(0, 0)
+    (x2, y2) = win.toWorld(win.getWidth() - 1, win.getHeight() - 1)
+    return (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2))
+
+def pixel(win):
+    # The size of a pixel of `win` in world coordinates
+    if win.trans is None:
+        return 1.0
+    return max(abs(win.trans.xscale), abs(win.trans.yscale))
+
+def trace(prog, step_size=4, angle=90, position=(0.0, 0.0), heading=0.0):
+    # The box around the drawing of `prog`, following it one command at
+    # a time like `LSys.run` does.
+    box = None
+    (x, y) = position
+    theta = heading
+    turn = math.pi * angle / 180.0
+    stack = []
+    for c in prog:
+        if c.isalpha():
+            (dx, dy) = delta(theta)
+            (x0, y0) = (x, y)
+            (x, y) = (x + step_size*dx, y + step_size*dy)
+            if c.isupper():
+                box = union(box, (min(x0, x), min(y0, y),
+                                  max(x0, x), max(y0, y)))
+        elif c == '+':
+            theta += turn
+        elif c == '-':
+            theta -= turn
+        elif c == '[':
+            stack.append((x, y, theta))
+        elif c == ']':
+            (x, y, theta) = stack.pop()
+    return box
+
+def bounds(lsys, n, step_size=4, angle=None,
+           position=(0.0, 0.0), heading=0.0):
+    """
+    Returns the box (xmin, ymin, xmax, ymax) around the segments drawn
+    by `lsys` after `n` rewrites, for a turtle starting at `position`
+    with `heading` in radians, or None if nothing is drawn.
+    """
+    if angle is None:
+        angle = getattr(lsys, 'angle', 90)
+    # Headings are taken within a single turn
+    degrees = math.degrees(heading) % 360
+    steps = turn_steps(angle, degrees)
+    h = degrees * steps / 360.0
+    if steps <= MAX_STEPS and abs(h - round(h)) < 1e-6:
+        try:
+            extents = Extents(lsys, step_size, angle, steps)
+            return extents.bounds(n, position, int(round(h)) % steps)
+        except ValueError:
+            # Brackets that only match across rules
+            pass
+    return trace(derive(lsys.axiom, lsys.rules, n), step_size, angle,
+                 position, heading)
+
+def fit(win, box, margin=0.05):
+    """
+    Sets the coordinates of `win` so that `box` fills it, keeping the
+    aspect ratio and leaving `margin` (as a fraction of the size of the
+    box) on every side. As for the turtle, y points down the window.
+    When `box` is None, as it is when nothing is drawn, `win` is left
+    as it is.
+    """
+    if box is None:
+        return
+    (xmin, ymin, xmax, ymax) = box
+    (w, h) = (win.getWidth(), win.getHeight())
+    width = max(xmax - xmin, 1e-9) * (1 + 2.0*margin)
+    height = max(ymax - ymin, 1e-9) * (1 + 2.0*margin)
+    scale = max(width / (w - 1), height / (h - 1))
+    (cx, cy) = ((xmin + xmax) / 2.0, (ymin + ymax) / 2.0)
+    (dx, dy) = (scale * (w - 1) / 2.0, scale * (h - 1) / 2.0)
+    win.setCoords(cx - dx, cy + dy, cx + dx, cy - dy)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The cache module keeps derived programs on disk so that they can be
+shared between runs. Each entry is keyed by a hash of the axiom, the
+production rules and the number of iterations, and is handed back as a
+read-only memory map, which `LSys.run` can iterate like a string.
+
+Typical usage of this module is simply as follows:
+
+    from cache import DerivationCache
+    from lsys import LSys
+
+    lsys = LSys(turtle, Plant)
+    lsys.rewrite(8, cache=DerivationCache('/tmp/lsys'))
+
+The total size of the entries is kept under a byte budget by evicting
+the least recently used ones. Recency is the modification time of the
+entry, which is refreshed on every hit.
+"""
+
+import hashlib
+import mmap
+import os
+import tempfile
+
+class DerivationCache:
+    def __init__(self, path, budget=1 << 30):
+        self.path = path
+        self.budget = budget
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def filename(self, lsys, n):
+        key = repr((lsys.axiom, sorted(lsys.rules.items()), n))
+        name = hashlib.sha1(key).hexdigest() + '.prog'
+        return os.path.join(self.path, name)
+
+    def open(self, lsys, n):
+        """
+        Returns the cached program for `lsys` after `n` iterations as a
+        memory map, or None if it is not in the cache.
+        """
+        name = self.filename(lsys, n)
+        try:
+            f = open(name, 'rb')
+        except IOError:
+            return None
+
+        try:
+            # Mark the entry as recently used
+            os.utime(name, None)
+
+            # Empty files cannot be mapped, but then there is nothing to
+            # map anyway.
+            if os.fstat(f.fileno()).st_size == 0:
+                return ''
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+
+    def store(self, lsys, n, prog):
+        """
+        Adds the program for `lsys` after `n` iterations to the cache,
+        evicting older entries if the budget is exceeded.
+        """
+        name = self.filename(lsys, n)
+
+        # Write to a temporary file first so that a concurrent reader
+        # never maps a partially written entry.
+        (fd, tmp) = tempfile.mkstemp(dir=self.path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(prog)
+            os.rename(tmp, name)
+        except:
+            os.remove(tmp)
+            raise
+
+        self.evict(keep=name)
+
+    def evict(self, keep=None):
+        entries = []
+        for name in os.listdir(self.path):
+            if not name.endswith('.prog'):
+                continue
+            name = os.path.join(self.path, name)
+            try:
+                st = os.stat(name)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, name))
+
+        # Drop the least recently used entries first. The entry that was
+        # just stored is always kept, even if it alone is over budget.
+        total = sum(size for (_, size, _) in entries)
+        for (_, size, name) in sorted(entries):
+            if total <= self.budget:
+                break
+            if name == keep:
+                continue
+            try:
+                os.remove(name)
+            except OSError:
+                # Another process may have evicted it already
+                pass
+            total -= size
+
+    def clear(self):
+        for name in os.listdir(self.path):
+            if name.endswith('.prog'):
+                os.remove(os.path.join(self.path, name))
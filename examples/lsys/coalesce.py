@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The coalesce module merges runs of collinear segments before they are
+drawn. Programs such as `IslandsAndLakes` or the `F -> FF` rule of
+`Plant` step forward many times in a row, and each step would otherwise
+become its own line on the canvas.
+
+Two segments are merged when the second starts where the first ends,
+continues in the same direction and is drawn with the same pen.
+`Coalescer` does this one segment at a time, in front of any function
+that draws a segment, and `coalesce` does it at once on the arrays
+produced by `vectorize.interpret`.
+"""
+
+# Segments whose directions differ by less than this (as the sine of
+# the angle between them) are taken to be collinear.
+TOLERANCE = 1e-9
+
+def collinear(ax, ay, bx, by):
+    # Whether the vectors a and b point in the same direction
+    cross = ax*by - ay*bx
+    dot = ax*bx + ay*by
+    return dot > 0 and cross*cross <= TOLERANCE*TOLERANCE * \
+                                      (ax*ax + ay*ay) * (bx*bx + by*by)
+
+class Coalescer:
+    def __init__(self, emit):
+        # `emit` is called as emit(x1, y1, x2, y2, pen) for each merged
+        # segment. The pen can be anything that compares equal for
+        # segments that may be merged.
+        self.emit = emit
+        self.pending = None
+
+    def add(self, x1, y1, x2, y2, pen):
+        p = self.pending
+        if p is not None:
+            (px1, py1, px2, py2, ppen) = p
+            if px2 == x1 and py2 == y1 and ppen == pen and \
+               collinear(px2-px1, py2-py1, x2-x1, y2-y1):
+                self.pending = (px1, py1, x2, y2, pen)
+                return
+            self.emit(*p)
+        self.pending = (x1, y1, x2, y2, pen)
+
+    def flush(self):
+        # Emits the segment being extended, if any. This must be called
+        # once the last segment has been added.
+        if self.pending is not None:
+            self.emit(*self.pending)
+            self.pending = None
+
+    def reset(self):
+        self.pending = None
+
+try:
+    import numpy as np
+
+    def coalesce(x1, y1, x2, y2, pens=None):
+        """
+        Merges consecutive collinear segments given as arrays, and
+        returns the arrays of the merged segments. If `pens` is given, it
+        is an array with the pen of each segment, and only segments with
+        the same pen are merged; the pens of the merged segments are
+        then returned as a fifth array.
+        """
+        ax = x2 - x1
+        ay = y2 - y1
+        cross = ax[:-1]*ay[1:] - ay[:-1]*ax[1:]
+        dot = ax[:-1]*ax[1:] + ay[:-1]*ay[1:]
+        joined = (x2[:-1] == x1[1:]) & (y2[:-1] == y1[1:]) & (dot > 0) & \
+                 (cross*cross <= TOLERANCE*TOLERANCE *
+                  (ax[:-1]**2 + ay[:-1]**2) * (ax[1:]**2 + ay[1:]**2))
+        if pens is not None:
+            joined &= pens[:-1] == pens[1:]
+
+        # Each run starts at a segment that is not joined to the one
+        # before it, and ends just before the next run starts.
+        starts = np.flatnonzero(np.concatenate([[True], ~joined]))
+        ends = np.concatenate([starts[1:] - 1, [len(x1) - 1]])
+        if len(x1) == 0:
+            starts = ends = starts[:0]
+        merged = (x1[starts], y1[starts], x2[ends], y2[ends])
+        if pens is not None:
+            merged += (pens[starts],)
+        return merged
+
+except ImportError as error:
+    def coalesce(x1, y1, x2, y2, pens=None):
+        raise error
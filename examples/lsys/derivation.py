@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The derivation module represents the generated string of an L-system
+without expanding it. Every occurrence of a symbol at a given depth
+expands identically, so the derivation is stored as a DAG with one node
+per (symbol, depth) pair, each knowing its length. The DAG has
+O(|alphabet| × n) nodes however long the string is, and can still be
+iterated, measured, indexed and sliced like a string.
+
+Typical usage of this module is simply as follows:
+
+    from derivation import Derivation
+    from examples import KochIsland
+
+    prog = Derivation(KochIsland, 12)
+    print len(prog), prog[1000000:1000020]
+"""
+
+from length import LengthIndex
+from system import Variant
+
+class Node:
+    def __init__(self, symbol, depth, children):
+        self.symbol = symbol
+        self.depth = depth
+        self.children = children
+        if children is None:
+            # Leaves are a single symbol. A variable at depth zero or
+            # a constant are both leaves.
+            self.length = 1
+        else:
+            # Erasing rules give inner nodes with no children at all
+            self.length = sum(child.length for child in children)
+
+    def __repr__(self):
+        return 'Node({}, {}, {})'.format(repr(self.symbol), self.depth,
+                                         self.length)
+
+class Derivation(object):
+    # A new-style class, since old-style instances get `d[i:j]` with
+    # the bounds clipped to `sys.maxint` and offset by `len`.
+
+    def __init__(self, lsys, n):
+        # The rules are copied, so that editing them later does not
+        # change a derivation already made.
+        self.lsys = lsys = Variant(lsys)
+        self.depth = n
+        self.index = LengthIndex(lsys)
+
+        # Maps (symbol, depth) to its node, so that every node is built
+        # once and shared by all of its occurrences.
+        self.nodes = {}
+
+        # The root stands for the whole axiom and has no symbol of its own
+        self.root = Node(None, n, tuple(self.node(c, n) for c in lsys.axiom))
+        self.length = self.root.length
+
+    def node(self, c, n):
+        k = (c, n)
+        if k not in self.nodes:
+            if n == 0 or c not in self.lsys.rules:
+                children = None
+            else:
+                children = tuple(self.node(x, n-1)
+                                 for x in self.lsys.rules[c])
+            self.nodes[k] = Node(c, n, children)
+        return self.nodes[k]
+
+    def __len__(self):
+        # `len` must return an int, which deep derivations can exceed.
+        # The `length` attribute has no such limit.
+        return self.length
+
+    def __iter__(self):
+        return self.walk()
+
+    # Offsets are found from the lengths memoized by `index`, which are
+    # those of the nodes. See `length`.
+
+    def walk(self, start=0):
+        """
+        Generates the symbols of the derivation, beginning at offset
+        `start`.
+        """
+        return self.index.walk(self.depth, start)
+
+    def __getitem__(self, k):
+        if isinstance(k, slice):
+            return self.slice(k.start, k.stop, k.step)
+        return self.index.symbol_at(self.depth, k)
+
+    def slice(self, start=None, stop=None, step=None):
+        return self.index.slice(self.depth, start, stop, step)
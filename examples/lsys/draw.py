@@ -1,5 +1,7 @@
 from state import *
 from graphics import *
+from coalesce import Coalescer, coalesce
+from segments import SegmentBuffer
 
 class PenState:
     def __init__(self):
@@ -8,16 +10,42 @@ class PenState:
         self.color = '#000000'
 
 class TurtleDraw:
-    def __init__(self, win):
-        self.state = TurtleState()
+    def __init__(self, win, state=None, coalesce=False, buffer=None):
+        # A `DiscreteTurtleState` can be passed in for systems that only
+        # turn by fixed angles. With `coalesce`, runs of collinear steps
+        # are drawn as single lines, and `flush` must be called once
+        # drawing is done.
+        #
+        # Every segment is recorded in `buffer`, which is a
+        # `SegmentBuffer` unless another object with the same `append`
+        # and `extend` methods is given. Lines are only created when
+        # `win` is set; with no window, the drawing can be rendered later
+        # in one go.
+        self.state = state if state is not None else TurtleState()
         self.pen = PenState()
         self.win = win
-        self.buffer = []
+        self.buffer = buffer if buffer is not None else SegmentBuffer()
+        self.lines = []
+        self.coalescer = Coalescer(self.emit) if coalesce else None
 
     def clear(self):
-        for line in self.buffer:
-            line.undraw()
-        self.buffer = []
+        if self.coalescer is not None:
+            self.coalescer.reset()
+        if self.lines:
+            self.win.undraw_many(self.lines)
+        self.lines = []
+        self.buffer.clear()
+
+    def render(self, win):
+        # Draws every recorded segment in `win`, all in one go.
+        self.win = win
+        lines = [self.line(*segment) for segment in self.buffer]
+        win.draw_many(lines)
+        self.lines.extend(lines)
+
+    def flush(self):
+        if self.coalescer is not None:
+            self.coalescer.flush()
 
     def goto(self, x, y):
         last_pos = self.state.position
@@ -39,11 +67,46 @@ class TurtleDraw:
 
     def draw_line(self, (x1, y1), (x2, y2)):
         if self.pen.is_down:
-            line = Line(Point(x1, y1), Point(x2, y2))
-            line.draw(self.win)
-            line.setFill(self.pen.color)
-            line.setWidth(self.pen.width)
-            self.buffer.append(line)
+            pen = (self.pen.color, self.pen.width)
+            if self.coalescer is not None:
+                self.coalescer.add(x1, y1, x2, y2, pen)
+            else:
+                self.emit(x1, y1, x2, y2, pen)
+
+    def emit(self, x1, y1, x2, y2, (color, width)):
+        self.buffer.append(x1, y1, x2, y2, color, width)
+        if self.win is not None:
+            self.draw(x1, y1, x2, y2, color, width)
+
+    def draw(self, x1, y1, x2, y2, color, width):
+        line = self.line(x1, y1, x2, y2, color, width)
+        line.draw(self.win)
+        self.lines.append(line)
+
+    def line(self, x1, y1, x2, y2, color, width):
+        # The options are set before the line is drawn, so that it is
+        # created with them rather than reconfigured.
+        line = Line(Point(x1, y1), Point(x2, y2))
+        line.setFill(color)
+        line.setWidth(width)
+        return line
+
+    def draw_segments(self, x1, y1, x2, y2):
+        # Draws a batch of segments given as arrays of coordinates, such
+        # as those produced by `vectorize.interpret`. The arrays go into
+        # the buffer in one call, and lines are only made for a window.
+        if not self.pen.is_down:
+            return
+        if self.coalescer is not None:
+            self.coalescer.flush()
+            (x1, y1, x2, y2) = coalesce(x1, y1, x2, y2)
+        (color, width) = (self.pen.color, self.pen.width)
+        self.buffer.extend(x1, y1, x2, y2, color, width)
+        if self.win is not None:
+            lines = [self.line(*(segment + (color, width)))
+                     for segment in zip(x1, y1, x2, y2)]
+            self.win.draw_many(lines)
+            self.lines.extend(lines)
 
     def forward(self, n=1):
         last_pos = self.state.position
@@ -0,0 +1,299 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The engine module is a NumPy backend for rewriting L-systems. Each
+symbol of the alphabet is given a small integer code, the production
+rules are flattened into a single array of codes, and every generation
+is produced with vectorized gathers into a preallocated buffer instead
+of a Python loop over characters.
+
+Typical usage of this module is simply as follows:
+
+    from engine import rewrite
+    from examples import Plant
+
+    prog = rewrite(Plant, 8)
+"""
+
+import sys
+
+from length import alphabet, LengthIndex
+
+# The number of output symbols produced by a single vectorized gather.
+# Generations are processed in slices of this size so that the index
+# temporaries stay small however long the program grows.
+CHUNK = 1 << 20
+
+# The longest expansion of a single symbol kept in the block table used
+# for the last generations.
+BLOCK = 1 << 16
+
+try:
+    import numpy as np
+
+    class RuleTable:
+        def __init__(self, lsys):
+            self.lsys = lsys
+            self.alphabet = alphabet(lsys)
+            self.index = LengthIndex(lsys)
+            self.cache = {}
+
+            # Maps a byte to its code, and a code back to its byte
+            self.codes = np.zeros(256, dtype=np.uint8)
+            for (i, c) in enumerate(self.alphabet):
+                self.codes[ord(c)] = i
+            self.symbols = self.alphabet.ljust(256, '\0')
+
+            # Every symbol has a production. Constants simply produce
+            # themselves, so the gather below needs no special case.
+            prods = [self.encode(lsys.rules.get(c, c))
+                     for c in self.alphabet]
+            self.sizes = np.array([len(p) for p in prods], dtype=np.int64)
+            self.offsets = np.zeros(len(prods), dtype=np.int64)
+            self.offsets[1:] = np.cumsum(self.sizes)[:-1]
+            self.data = np.concatenate(prods).astype(np.uint8)
+
+            # Source symbols per slice, chosen so that a slice can never
+            # produce more than `CHUNK` symbols.
+            self.chunk = max(1, CHUNK // max(1, int(self.sizes.max())))
+            self.ramp = np.arange(self.chunk * max(1, int(self.sizes.max())),
+                                  dtype=np.int64)
+
+        def encode(self, s):
+            return self.codes[np.frombuffer(s, dtype=np.uint8)]
+
+        def decode(self, codes):
+            # `str.translate` is a much faster byte lookup than a NumPy
+            # gather with a uint8 index.
+            return codes.tobytes().translate(self.symbols)
+
+        def lengths(self, codes, n):
+            # The length of each generation 0..n grown from `codes`,
+            # computed from the memoized symbol lengths without rewriting.
+            counts = np.bincount(codes, minlength=len(self.alphabet))
+            used = [(c, int(k)) for (c, k) in zip(self.alphabet, counts) if k]
+            return [sum(k * self.index.symbol_length(c, m) for (c, k) in used)
+                    for m in xrange(n+1)]
+
+        def step(self, src, dst):
+            """
+            Writes the generation following `src` into `dst` and returns
+            the view of `dst` that was written.
+            """
+            pos = 0
+            for i in xrange(0, len(src), self.chunk):
+                s = src[i:i+self.chunk]
+                sizes = self.sizes[s]
+                ends = np.cumsum(sizes)
+                m = int(ends[-1])
+
+                # Output symbol j of this slice comes from the production
+                # of its parent p at position j - start(p).
+                idx = np.repeat(self.offsets[s] - (ends - sizes), sizes)
+                idx += self.ramp[:m]
+                np.take(self.data, idx, out=dst[pos:pos+m])
+                pos += m
+            return dst[:pos]
+
+        def blocks(self, d):
+            """
+            Returns three object arrays indexed by code, holding the
+            expansion of each symbol after `d` iterations as codes, as a
+            decoded string, and as the bytes of that string.
+            """
+            if d not in self.cache:
+                blocks = np.empty(len(self.alphabet), dtype=object)
+                strings = np.empty(len(self.alphabet), dtype=object)
+                decoded = np.empty(len(self.alphabet), dtype=object)
+                for i in xrange(len(self.alphabet)):
+                    code = np.array([i], dtype=np.uint8)
+                    blocks[i] = self.generations(code, d)
+                    strings[i] = self.decode(blocks[i])
+                    decoded[i] = np.frombuffer(strings[i], dtype=np.uint8)
+                self.cache[d] = (blocks, strings, decoded)
+            return self.cache[d]
+
+        def block_depth(self, n):
+            # The deepest level, at most `n`, at which no symbol expands to
+            # more than `BLOCK` symbols. Rules longer than that still get
+            # one level so that the last generation is always copied in
+            # whole productions.
+            d = 1
+            while d < n and max(self.index.symbol_length(c, d+1)
+                                for c in self.alphabet) <= BLOCK:
+                d += 1
+            return min(d, n)
+
+        def generations(self, codes, n):
+            # Applies `step` `n` times, alternating between two buffers
+            # sized for the longest generation.
+            capacity = max(self.lengths(codes, n))
+            bufs = [np.empty(capacity, dtype=np.uint8) for _ in xrange(2)]
+            src = codes
+            for i in xrange(n):
+                src = self.step(src, bufs[i % 2])
+            return src.copy() if n > 0 else codes.copy()
+
+        def expand(self, codes, n, out=None, decode=False):
+            """
+            Rewrites `codes` `n` times and returns the result as a view of
+            `out`, which is allocated when not given. With `decode` the
+            result holds the bytes of the symbols instead of their codes.
+            """
+            size = self.lengths(codes, n)[-1]
+            if out is None:
+                out = np.empty(size, dtype=np.uint8)
+            if n == 0:
+                if decode:
+                    codes = np.frombuffer(self.decode(codes), dtype=np.uint8)
+                out[:size] = codes
+                return out[:size]
+
+            # Only the shallow generations are rewritten symbol by symbol.
+            # The last `d` levels are copied as whole precomputed blocks,
+            # so the bulk of the output is written by memcpy straight into
+            # `out` with no intermediate buffer.
+            d = self.block_depth(n)
+            g = self.generations(codes, n-d)
+            parts = self.blocks(d)[2 if decode else 0][g].tolist()
+            if parts:
+                np.concatenate(parts, out=out[:size])
+            return out[:size]
+
+        def render(self, codes, n):
+            """
+            Like `expand`, but returns the program as a string. The blocks
+            are joined already decoded, which saves decoding the whole
+            result afterwards.
+            """
+            if n == 0:
+                return self.decode(codes)
+            d = self.block_depth(n)
+            g = self.generations(codes, n-d)
+            return ''.join(self.blocks(d)[1][g].tolist())
+
+    # State inherited by each pool worker: its own rule table, the
+    # generation being split, and a view of the shared output buffer.
+    _worker = {}
+
+    def init_worker(lsys, gen, shared):
+        _worker['table'] = RuleTable(lsys)
+        _worker['gen'] = gen
+        _worker['out'] = np.frombuffer(shared, dtype=np.uint8)
+
+    def expand_chunk(args):
+        # Expands symbols `start:stop` of the split generation `n` more
+        # times, writing the decoded result straight into its place in
+        # the shared buffer.
+        (start, stop, offset, size, n) = args
+        out = _worker['out'][offset:offset+size]
+        _worker['table'].expand(_worker['gen'][start:stop], n, out, True)
+
+    def parallel_rewrite(table, n, workers):
+        import mmap
+        import multiprocessing
+
+        # Rewrite serially until the generation is long enough to give
+        # every worker several chunks. D0L systems are context-free, so
+        # each symbol of that generation then expands on its own.
+        chunks = workers * 8
+        gen = table.encode(table.lsys.axiom)
+        m = 0
+        while len(gen) < chunks and m < n:
+            gen = table.expand(gen, 1)
+            m += 1
+        if len(gen) < chunks:
+            return table.decode(gen)
+
+        # Where each chunk lands in the output follows from the length of
+        # every symbol after the remaining `n-m` iterations.
+        sizes = np.array([table.index.symbol_length(c, n-m)
+                          for c in table.alphabet], dtype=np.int64)
+        ends = np.cumsum(sizes[gen])
+        total = int(ends[-1])
+        if total == 0:
+            return ''
+        bounds = np.linspace(0, len(gen), chunks+1).astype(np.int64)
+        tasks = []
+        for (a, b) in zip(bounds[:-1], bounds[1:]):
+            offset = int(ends[a-1]) if a > 0 else 0
+            tasks.append((int(a), int(b), offset, int(ends[b-1]) - offset,
+                          n-m))
+
+        # An anonymous shared mapping is inherited by the forked workers,
+        # which each fill their own slice of it; no partial result is ever
+        # sent back through a pipe. Since it can only be inherited, the
+        # pool is forked anew for every call.
+        shared = mmap.mmap(-1, total)
+        pool = multiprocessing.Pool(workers, init_worker,
+                                    (table.lsys, gen, shared))
+        try:
+            pool.map(expand_chunk, tasks, chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+
+        # The mapping itself is the program, which `LSys.run`, `vectorize`
+        # and the cache all accept, so it is never copied into a string.
+        return shared
+
+    def rewrite(lsys, n, workers=1):
+        """
+        Returns the generated string after `n` iterations of application
+        of the production rules, optionally expanded by a pool of
+        `workers` processes. The program is then returned as a shared
+        memory map rather than a string.
+        """
+        table = RuleTable(lsys)
+        if workers > 1:
+            return parallel_rewrite(table, n, workers)
+        return table.render(table.encode(lsys.axiom), n)
+
+except ImportError as error:
+    def rewrite(lsys, n, workers=1):
+        raise error
+
+#
+# Testing
+#
+
+def verify():
+    sys.stdout.write('Verifying...\n')
+    sys.stdout.flush()
+    from system import derive
+    from examples import Demo, Fibonacci, KochIsland, QuadraticSnowflake, \
+                         IslandsAndLakes, Plant, Penrose, Arrowhead, \
+                         DragonCurve, Triangle, Stress
+
+    for lsys in [Demo, Fibonacci, KochIsland, QuadraticSnowflake,
+                 IslandsAndLakes, Plant, Penrose, Arrowhead,
+                 DragonCurve, Triangle, Stress]:
+        for n in xrange(0, 4):
+            r = ''.join(derive(lsys.axiom, lsys.rules, n))
+            assert(rewrite(lsys, n) == r)
+            table = RuleTable(lsys)
+            codes = table.expand(table.encode(lsys.axiom), n)
+            assert(table.decode(codes) == r)
+            assert(rewrite(lsys, n, workers=2)[:] == r)
+
+def benchmark():
+    import timeit
+    from length import length
+    from examples import Plant, Stress
+
+    verify()
+
+    global lsys
+    for (lsys, n) in [(Plant, 9), (Stress, 3)]:
+        size = length(lsys, n)
+        setup = ('from lsys import LSys\n'
+                 'from __main__ import lsys\n'
+                 'l = LSys(None, lsys)')
+        for backend in ['python', 'numpy']:
+            prog = 'l.rewrite({}, backend={})'.format(n, repr(backend))
+            t = timeit.timeit(prog, number=3, setup=setup) / 3
+            sys.stdout.write('{} n={} {}: {:.0f} symbols/s\n'.format(
+                lsys.__name__, n, backend, size / t))
+
+if __name__ == '__main__': benchmark()
@@ -161,6 +161,7 @@ __version__ = "5.0"
 #     Added Entry boxes.
 
 import time, os, sys
+from collections import OrderedDict
 
 try:  # import as appropriate for 2.x vs. 3.x
    import tkinter as tk
@@ -182,11 +183,29 @@ BAD_OPTION = "Illegal option value"
 ##########################################################################
 # global variables and funtions
 
-_root = tk.Tk()
-_root.withdraw()
+# The hidden Tk root shared by every window. It is only created once a
+#   window or another Tk object needs it, so that importing this module
+#   needs no display, and programs that never open a window never pay
+#   for starting Tk.
+_root = None
+
+def _get_root():
+    global _root
+    if _root is None:
+        _root = tk.Tk()
+        _root.withdraw()
+        # MacOS fix 1
+        _root.update()
+    return _root
 
 _update_lasttime = time.time()
 
+# A Tcl lambda that runs a list of commands, each a list of words, and
+# returns the list of their results. The commands are passed as Tcl
+# objects, so no word is ever quoted into a script.
+_run_all = "{commands} {set results {}; foreach c $commands " \
+           "{lappend results [eval $c]}; return $results}"
+
 def update(rate=None):
     global _update_lasttime
     if rate:
@@ -198,7 +217,8 @@ def update(rate=None):
         else:
             _update_lasttime = now
 
-    _root.update()
+    if _root is not None:
+        _root.update()
 
 ############################################################################
 # Graphics classes start here
@@ -210,7 +230,7 @@ class GraphWin(tk.Canvas):
     def __init__(self, title="Graphics Window",
                  width=200, height=200, autoflush=True):
         assert type(title) == type(""), "Title must be a string"
-        master = tk.Toplevel(_root)
+        master = tk.Toplevel(_get_root())
         master.protocol("WM_DELETE_WINDOW", self.close)
         tk.Canvas.__init__(self, master, width=width, height=height,
                            highlightthickness=0, bd=0)
@@ -218,7 +238,8 @@ class GraphWin(tk.Canvas):
         self.pack()
         master.resizable(0,0)
         self.foreground = "black"
-        self.items = []
+        # Drawn objects by canvas id, in the order they were drawn
+        self.items = OrderedDict()
         self.mouseX = None
         self.mouseY = None
         self.bind("<Button-1>", self._onClick)
@@ -231,7 +252,7 @@ class GraphWin(tk.Canvas):
         self.closed = False
         master.lift()
         self.lastKey = ""
-        if autoflush: _root.update()
+        if autoflush: _get_root().update()
 
     def __repr__(self):
         if self.isClosed():
@@ -283,7 +304,7 @@ class GraphWin(tk.Canvas):
 
     def __autoflush(self):
         if self.autoflush:
-            _root.update()
+            _get_root().update()
 
     
     def plot(self, x, y, color="black"):
@@ -387,16 +408,95 @@ class GraphWin(tk.Canvas):
             self._mouseCallback(Point(e.x, e.y))
 
     def addItem(self, item):
-        self.items.append(item)
+        self.items[item.id] = item
 
     def delItem(self, item):
-        self.items.remove(item)
+        del self.items[item.id]
+
+    def clear(self):
+        """Undraw every object in the window at once"""
+        self.__checkOpen()
+        self.delete("all")
+        for item in self.items.values():
+            item.canvas = None
+            item.id = None
+        self.items.clear()
+        self.__autoflush()
 
     def redraw(self):
-        for item in self.items[:]:
-            item.undraw()
-            item.draw(self)
+        # The new canvas items are created before the old ones are
+        # deleted, so nothing is lost if creating them fails.
+        items = list(self.items.values())
+        ids = self._create_many(items)
+        self.delete(*[item.id for item in items])
+        self.items.clear()
+        for (item, i) in zip(items, ids):
+            item.id = i
+            self.addItem(item)
         self.update()
+
+    def draw_many(self, objects):
+        """Draw all of objects in the window. The canvas items are
+        created by a single Tcl evaluation, and the window is only
+        updated once, so this is much faster than drawing each object
+        in turn. Options should be set on the objects beforehand."""
+
+        self.__checkOpen()
+        objects = list(objects)
+        for obj in objects:
+            if obj.canvas and not obj.canvas.isClosed():
+                raise GraphicsError(OBJ_ALREADY_DRAWN)
+        ids = self._create_many(objects)
+        for (obj, i) in zip(objects, ids):
+            obj.canvas = self
+            obj.id = i
+            self.addItem(obj)
+        self.__autoflush()
+
+    def _create_many(self, objects):
+        # Creates the canvas items of objects, without drawing them as
+        # such, and returns the id of the item of each.
+
+        # Each object draws itself as usual, but the items it creates are
+        # only recorded, as Tcl commands, by this stand-in for _create.
+        commands = []
+        def record(itemType, args, kw):
+            args = tk._flatten(args)
+            cnf = {}
+            if args and isinstance(args[-1], (dict, tuple)):
+                cnf = args[-1]
+                args = args[:-1]
+            commands.append((self._w, 'create', itemType) + args +
+                            self._options(cnf, kw))
+            return len(commands) - 1
+        self._create = record
+        try:
+            drawn = [obj._draw(self, obj.config) for obj in objects]
+        finally:
+            del self._create
+
+        ids = self.tk.splitlist(self.tk.call('apply', _run_all,
+                                             tuple(commands)))
+        return [int(ids[i]) for i in drawn]
+
+    def undraw_many(self, objects):
+        """Undraw all of objects, deleting their canvas items in a single
+        call and updating the window once."""
+
+        objects = [obj for obj in objects if obj.canvas]
+        if not self.closed:
+            mine = [obj for obj in objects if obj.canvas is self]
+            if mine:
+                self.delete(*[obj.id for obj in mine])
+            for obj in mine:
+                self.delItem(obj)
+        for obj in objects:
+            if obj.canvas is self:
+                obj.canvas = None
+                obj.id = None
+            else:
+                obj.undraw()
+        self.__autoflush()
         
                       
 class Transform:
@@ -484,7 +584,7 @@ class GraphicsObject:
         self.id = self._draw(graphwin, self.config)
         graphwin.addItem(self)
         if graphwin.autoflush:
-            _root.update()
+            _get_root().update()
         return self
 
             
@@ -498,7 +598,7 @@ class GraphicsObject:
             self.canvas.delete(self.id)
             self.canvas.delItem(self)
             if self.canvas.autoflush:
-                _root.update()
+                _get_root().update()
         self.canvas = None
         self.id = None
 
@@ -520,7 +620,7 @@ class GraphicsObject:
                 y = dy
             self.canvas.move(self.id, x, y)
             if canvas.autoflush:
-                _root.update()
+                _get_root().update()
            
     def _reconfig(self, option, setting):
         # Internal method for changing configuration of the object
@@ -533,7 +633,7 @@ class GraphicsObject:
         if self.canvas and not self.canvas.isClosed():
             self.canvas.itemconfig(self.id, options)
             if self.canvas.autoflush:
-                _root.update()
+                _get_root().update()
 
 
     def _draw(self, canvas, options):
@@ -787,7 +887,7 @@ class Entry(GraphicsObject):
         self.anchor = p.clone()
         #print self.anchor
         self.width = width
-        self.text = tk.StringVar(_root)
+        self.text = tk.StringVar(_get_root())
         self.text.set("")
         self.fill = "gray"
         self.color = "black"
@@ -882,10 +982,10 @@ class Image(GraphicsObject):
         self.imageId = Image.idCount
         Image.idCount = Image.idCount + 1
         if len(pixmap) == 1: # file name provided
-            self.img = tk.PhotoImage(file=pixmap[0], master=_root)
+            self.img = tk.PhotoImage(file=pixmap[0], master=_get_root())
         else: # width and height provided
             width, height = pixmap
-            self.img = tk.PhotoImage(master=_root, width=width, height=height)
+            self.img = tk.PhotoImage(master=_get_root(), width=width, height=height)
 
     def __repr__(self):
         return "Image({}, {}, {})".format(self.anchor, self.getWidth(), self.getHeight())
@@ -1008,8 +1108,5 @@ def test():
 #MacOS fix 2
 #tk.Toplevel(_root).destroy()
 
-# MacOS fix 1
-update()
-
 if __name__ == "__main__":
     test()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The incremental module rewrites an L-system while remembering the
+expansion of every (symbol, depth) pair. Asking for one more generation
+then only costs one level of joins over the remembered expansions, and
+editing a production only derives again the symbols whose expansion can
+reach the edited one.
+
+Typical usage of this module is simply as follows:
+
+    from incremental import Incremental
+    from examples import Plant
+
+    history = Incremental(Plant)
+    prog = history.rewrite(7)
+    history.set_rule('F', 'FFF')
+    prog = history.rewrite(7)   # Only 'F' and 'X' are derived again
+"""
+
+class Incremental:
+    def __init__(self, lsys):
+        self.axiom = lsys.axiom
+
+        # A private copy, since the rules of the catalog systems are
+        # shared class attributes.
+        self.rules = dict(lsys.rules)
+
+        # Maps (symbol, depth) to the expansion of the symbol
+        self.memo = {}
+
+        # Maps depth to the whole program at that depth
+        self.history = {}
+
+    def expand(self, c, n):
+        # Constants and depth zero expand to themselves and are not
+        # worth remembering.
+        if n == 0 or c not in self.rules:
+            return c
+        k = (c, n)
+        if k not in self.memo:
+            self.memo[k] = ''.join([self.expand(x, n-1)
+                                    for x in self.rules[c]])
+        return self.memo[k]
+
+    def rewrite(self, n):
+        """
+        Returns the generated string after `n` iterations of application
+        of the production rules.
+        """
+        if n not in self.history:
+            self.history[n] = ''.join([self.expand(c, n)
+                                       for c in self.axiom])
+        return self.history[n]
+
+    def dependents(self, symbol):
+        # All symbols whose expansion can reach `symbol`, including the
+        # symbol itself, found by walking the rules backwards.
+        users = {}
+        for (v, q) in self.rules.items():
+            for x in set(q):
+                users.setdefault(x, set()).add(v)
+
+        found = set([symbol])
+        stack = [symbol]
+        while stack:
+            for v in users.get(stack.pop(), ()):
+                if v not in found:
+                    found.add(v)
+                    stack.append(v)
+        return found
+
+    def set_rule(self, symbol, production):
+        """
+        Replaces the production for `symbol`, or removes it if
+        `production` is None, and forgets only the expansions that
+        depended on it.
+        """
+        # The dependents must be found with the old rules, since those
+        # are what the remembered expansions were built from.
+        stale = self.dependents(symbol)
+        self.memo = {k: v for (k, v) in self.memo.items()
+                     if k[0] not in stale}
+        if stale & set(self.axiom):
+            self.history = {}
+
+        if production is None:
+            self.rules.pop(symbol, None)
+        else:
+            self.rules[symbol] = production
@@ -15,6 +15,7 @@ Typical usage of this module is simply as follows:
 """
 
 from collections import deque
+from itertools import islice
 import sys
 
 def variables(lsys):
@@ -149,6 +150,183 @@ def length_impl(axiom,  # The current axiom
     return cache[k]
 
 
+def lengths(lsys, n):
+    """
+    Calculates the lengths of the generated string after 0, 1, ..., `n`
+    iterations of application of the production rules.
+    """
+    return LengthOracle(lsys).lengths(n)
+
+
+def histogram(lsys, n):
+    """
+    Counts each symbol of the generated string after `n` iterations of
+    application of the production rules, without generating it. For
+    example, the count of 'F' is the number of lines a render will draw.
+    """
+    return LengthOracle(lsys).histogram(n)
+
+
+class LengthOracle:
+    """
+    Answers repeated length queries on one L-system. The LUT and the
+    cache of `length_impl` are built once and kept between calls, and
+    the lengths at every depth up to `n` can be computed in a single
+    pass with `lengths`.
+    """
+
+    def __init__(self, lsys):
+        self.lsys = lsys
+
+        # The same LUT and cache that `length` builds, kept around
+        ss = [lsys.axiom] + lsys.rules.values()
+        self.lut = build_lut(lsys, ss)
+        self.cache = { (k, 0): len(k) for k in ss }
+
+        # Histograms of the generated string at each depth computed so
+        # far, starting with that of the axiom.
+        self.series = [self.lut[lsys.axiom][0]]
+
+    def measure(self, s, n):
+        # The length of `s` after `n` iterations. As with `length_impl`,
+        # `s` must be the axiom or the right-hand-side of a rule.
+        return length_impl(s, self.lsys.rules, n, self.cache, self.lut)
+
+    def symbol_length(self, c, n):
+        # The length of the expansion of the single symbol `c`
+        if n == 0 or c not in self.lsys.rules:
+            return 1
+        return self.measure(self.lsys.rules[c], n-1)
+
+    def length(self, n):
+        """
+        Calculates the length of the generated string after `n`
+        iterations of application of the production rules.
+        """
+        if n < len(self.series):
+            return sum(self.series[n].values())
+        return self.measure(self.lsys.axiom, n)
+
+    def step(self, h):
+        # One application of the rules to a histogram: each variable
+        # contributes the histogram of its right-hand-side, scaled by its
+        # count, and each constant carries over. This is the histogram
+        # times the growth matrix, using only its non-zero entries.
+        result = {}
+        for (x, k) in h.items():
+            if x in self.lsys.rules:
+                for (y, j) in self.lut[self.lsys.rules[x]][0].items():
+                    result[y] = result.get(y, 0) + k*j
+            else:
+                result[x] = result.get(x, 0) + k
+        return result
+
+    def extend(self, n):
+        # Makes sure the histograms up to depth `n` are in the series
+        while len(self.series) <= n:
+            self.series.append(self.step(self.series[-1]))
+
+    def lengths(self, n):
+        """
+        Returns the lengths of the generated string after 0, 1, ..., `n`
+        iterations.
+        """
+        self.extend(n)
+        return [sum(h.values()) for h in self.series[:n+1]]
+
+    def histogram(self, n):
+        """
+        Returns a map of each symbol of the alphabet to the number of
+        times it occurs in the generated string after `n` iterations.
+        """
+        self.extend(n)
+        h = dict.fromkeys(alphabet(self.lsys), 0)
+        h.update(self.series[n])
+        return h
+
+
+class LengthIndex(LengthOracle):
+    """
+    Answers positional queries on the generated string after `n`
+    iterations without expanding it. The memoized lengths are kept
+    between queries, so locating a symbol only costs a descent through
+    `n` right-hand-sides.
+    """
+
+    def symbol_at(self, n, k):
+        """
+        Returns the `k`-th symbol of the generated string after `n`
+        iterations. Negative indices count from the end.
+        """
+        size = self.length(n)
+        if k < 0:
+            k += size
+        if not 0 <= k < size:
+            raise IndexError('symbol index out of range')
+
+        # Skip over whole expansions until we find the one containing
+        # `k`, then descend into it.
+        s = self.lsys.axiom
+        while True:
+            for c in s:
+                m = self.symbol_length(c, n)
+                if k < m:
+                    break
+                k -= m
+            if n == 0 or c not in self.lsys.rules:
+                return c
+            (s, n) = (self.lsys.rules[c], n-1)
+
+    def walk(self, n, start=0):
+        """
+        Generates the symbols of the string after `n` iterations,
+        beginning at offset `start`.
+        """
+        rules = self.lsys.rules
+        stack = [(iter(self.lsys.axiom), n)]
+        while stack:
+            (it, depth) = stack[-1]
+            for c in it:
+                if start:
+                    # Still seeking: skip expansions that end before
+                    # `start` and descend into the one that contains it.
+                    m = self.symbol_length(c, depth)
+                    if start >= m:
+                        start -= m
+                        continue
+                if depth > 0 and c in rules:
+                    stack.append((iter(rules[c]), depth-1))
+                    break
+                yield c
+            else:
+                stack.pop()
+
+    def slice(self, n, start=None, stop=None, step=None):
+        """
+        Returns the window `[start:stop:step]` of the string after `n`
+        iterations, with the same conventions as slicing a string. Only
+        positive steps are supported.
+        """
+        if step is not None and step < 1:
+            raise ValueError('only positive steps are supported')
+        size = self.length(n)
+
+        # Derivations easily outgrow what `slice.indices` accepts, so the
+        # bounds are normalized by hand.
+        def clamp(i, default):
+            if i is None:
+                return default
+            if i < 0:
+                i += size
+            return min(max(i, 0), size)
+
+        start = clamp(start, 0)
+        stop = clamp(stop, size)
+        if stop <= start:
+            return ''
+        return ''.join(islice(self.walk(n, start), 0, stop-start, step))
+
+
 # The following methods require numpy
 try:
     import numpy as np
@@ -179,10 +357,122 @@ try:
         A = growth_matrix(lsys)
         return np.sum(pi * (A ** n))
 
+    class MatrixOracle:
+        """
+        Answers length and histogram queries with the growth matrix,
+        raised to the `n`-th power by binary exponentiation. The powers
+        A, A², A⁴, ... are cached, so after the first query at a given
+        magnitude a query costs O(k² log n) for an alphabet of k symbols.
+
+        The `mode` selects the arithmetic:
+
+          'exact'  Python integers. Exact, but the entries grow linearly
+                   in size with `n`.
+          'int64'  Machine integers. Fast, and raises OverflowError
+                   instead of silently wrapping.
+          'log'    Natural logarithms of the counts in floating point.
+                   Lengths are returned as logarithms, which stay
+                   representable for `n` in the billions and beyond.
+        """
+
+        def __init__(self, lsys, mode='exact'):
+            if mode not in ('exact', 'int64', 'log'):
+                raise ValueError('unknown mode: ' + repr(mode))
+            self.mode = mode
+            self.alphabet = alphabet(lsys)
+
+            A = np.array(growth_matrix(lsys), dtype='object')
+            pi = start_array(lsys)
+            if mode == 'int64':
+                A = A.astype(np.int64)
+                pi = pi.astype(np.int64)
+            elif mode == 'log':
+                with np.errstate(divide='ignore'):
+                    A = np.log(A.astype(np.float64))
+                    pi = np.log(pi.astype(np.float64))
+            self.start = pi
+            self.powers = [A]
+
+        def multiply(self, X, Y):
+            # The matrix product (or vector-matrix product) of X and Y in
+            # the arithmetic of the current mode.
+            if self.mode == 'log':
+                # log(Σ exp(x + y)), computed relative to the largest
+                # term so that nothing overflows.
+                M = np.expand_dims(X, -1) + Y
+                m = M.max(axis=-2)
+                m[np.isneginf(m)] = 0
+                with np.errstate(divide='ignore'):
+                    return m + np.log(np.exp(M - np.expand_dims(m, -2))
+                                      .sum(axis=-2))
+
+            Z = np.dot(X, Y)
+            if self.mode == 'int64':
+                # All counts are non-negative, so a wrapped product shows
+                # up as a negative entry, or is caught by the float
+                # estimate when it wrapped all the way around.
+                estimate = np.dot(X.astype(np.float64), Y.astype(np.float64))
+                if (Z < 0).any() or (estimate >= 2.0**63).any():
+                    raise OverflowError('counts exceed int64')
+            return Z
+
+        def power(self, i):
+            # A raised to the power 2**i
+            while len(self.powers) <= i:
+                P = self.powers[-1]
+                self.powers.append(self.multiply(P, P))
+            return self.powers[i]
+
+        def counts(self, n):
+            # The count vector π·Aⁿ, applying one cached power of two for
+            # each bit set in `n`.
+            v = self.start
+            i = 0
+            while n:
+                if n & 1:
+                    v = self.multiply(v, self.power(i))
+                n >>= 1
+                i += 1
+            return v
+
+        def length(self, n):
+            """
+            Calculates the length of the generated string after `n`
+            iterations, or its natural logarithm in 'log' mode.
+            """
+            v = self.counts(n)
+            if self.mode == 'log':
+                m = v.max()
+                if np.isneginf(m):
+                    return m
+                return m + np.log(np.exp(v - m).sum())
+            return v.sum()
+
+        def histogram(self, n):
+            """
+            Returns a map of each symbol to the number of times it occurs
+            in the generated string after `n` iterations.
+            """
+            return dict(zip(self.alphabet, self.counts(n)))
+
+    def power_length(lsys, n):
+        """
+        Calculates the length of the generated string after `n` iterations
+        of application of the production rules.
+        """
+        return MatrixOracle(lsys).length(n)
+
 except ImportError as error:
     def matrix_length(lsys, n):
         raise error
 
+    def power_length(lsys, n):
+        raise error
+
+    class MatrixOracle:
+        def __init__(self, lsys, mode='exact'):
+            raise error
+
 #
 # Visualization and inspection
 #
@@ -285,8 +575,12 @@ def verify():
                 + [random_lsys(20) for i in xrange(20)]:
         for n in xrange(0,20):
             m = matrix_length(lsys, n)
+            p = power_length(lsys, n)
             r = length(lsys, n)
             assert(m == r)
+            assert(p == r)
+        assert(lengths(lsys, 19) == [length(lsys, n) for n in xrange(20)])
+        assert(histogram(lsys, 19) == MatrixOracle(lsys).histogram(19))
 
 def benchmark():
     import timeit
@@ -298,13 +592,19 @@ def benchmark():
     global lsys
     lsys = Stress
 
-    setup = 'from __main__ import lsys, matrix_length, length'
-    prog = '[{}(lsys, n) for n in xrange(20)]'
-    for fn, label in [('length', 'Memo (stack)'),
-                      ('matrix_length', 'Matrix')]:
+    setup = ('from __main__ import lsys, matrix_length, power_length, '
+             'length, lengths')
+    for prog, label in [('[length(lsys, n) for n in xrange(20)]',
+                         'Memo (stack)'),
+                        ('[matrix_length(lsys, n) for n in xrange(20)]',
+                         'Matrix'),
+                        ('[power_length(lsys, n) for n in xrange(20)]',
+                         'Matrix (squaring)'),
+                        ('lengths(lsys, 19)',
+                         'Series')]:
         sys.stdout.write('{} method: '.format(label))
         sys.stdout.flush()
-        t = timeit.timeit(prog.format(fn), number=100, setup=setup)
+        t = timeit.timeit(prog, number=100, setup=setup)
         sys.stdout.write(repr(t) + '\n')
 
 def main():
@@ -1,3 +1,17 @@
+import math
+from functools import partial
+
+import bounds
+import engine
+import opcodes
+import vectorize
+from derivation import Derivation
+from incremental import Incremental
+from length import LengthIndex
+from state import turn_steps
+from subtree import Summaries, rotate
+from system import Variant, derive
+
 class LSys:
     def __init__(self, turtle, lsys):
         self.lsys = lsys
@@ -7,8 +21,68 @@ class LSys:
         self.angle = 90
         if hasattr(lsys, 'angle'):
             self.angle = lsys.angle
+        self.index = LengthIndex(lsys)
+        self.history = None
+        self.summaries = None
+        self.extents = None
+        self.depth = 0
+
+    def rewrite(self, n, backend='python', workers=None, cache=None,
+                incremental=False, lazy=False):
+        self.depth = n
+
+        # Lazy and incremental programs are derived their own way, so
+        # they cannot also be cached or use another backend.
+        if lazy or incremental:
+            if lazy and incremental:
+                raise ValueError('a program cannot be both lazy and '
+                                 'incremental')
+            if cache is not None or backend != 'python' or workers:
+                raise ValueError('lazy and incremental programs take no '
+                                 'cache, backend or workers')
+
+        # A lazy program is the derivation DAG, which iterates, indexes and
+        # slices like the expanded string while staying tiny. This is the
+        # representation to use for deep renders.
+        if lazy:
+            self.prog = Derivation(self.lsys, n)
+            return
+
+        # Incremental rewriting remembers every expansion it derives, so
+        # that later calls and rule edits reuse all that is unchanged.
+        if incremental:
+            if self.history is None:
+                self.history = Incremental(self.lsys)
+            self.prog = self.history.rewrite(n)
+            return
+
+        # With a warm cache the program is simply mapped from disk.
+        # Otherwise it is derived as usual and stored for next time.
+        if cache is not None:
+            if backend == 'rle':
+                raise ValueError('run-length programs are not cached')
+            prog = cache.open(self.lsys, n)
+            if prog is None:
+                self.rewrite(n, backend, workers)
+                cache.store(self.lsys, n, self.prog)
+                prog = cache.open(self.lsys, n)
+            self.prog = prog
+            return
+
+        # Runs of repeated symbols are rewritten and stored as one
+        if backend == 'rle':
+            if workers:
+                raise ValueError('run-length programs are rewritten serially')
+            self.prog = opcodes.rewrite(self.lsys, n)
+            return
+
+        # Splitting the work over processes always uses the NumPy engine
+        if backend == 'numpy' or workers:
+            self.prog = engine.rewrite(self.lsys, n, workers or 1)
+            return
+        elif backend != 'python':
+            raise ValueError('unknown backend: ' + repr(backend))
 
-    def rewrite(self, n):
         axiom = self.lsys.axiom
         for _ in xrange(n):
             result = []
@@ -16,22 +90,246 @@ class LSys:
                 result.append(self.lsys.rules.get(c, c))
             axiom = ''.join(result)
         self.prog = axiom 
+
+    def set_rule(self, symbol, production):
+        # Replaces the production for `symbol`, or removes it when
+        # `production` is None. This edits a private copy of the system.
+        if not isinstance(self.lsys, Variant):
+            self.lsys = Variant(self.lsys)
+        if production is None:
+            self.lsys.rules.pop(symbol, None)
+        else:
+            self.lsys.rules[symbol] = production
+        self.index = LengthIndex(self.lsys)
+        self.summaries = None
+        self.extents = None
+        if self.history is not None:
+            self.history.set_rule(symbol, production)
+
+    def symbol_at(self, n, k):
+        # Looks up a single symbol of the program after `n` rewrites
+        # without expanding it.
+        return self.index.symbol_at(n, k)
+
+    def slice(self, n, start=None, stop=None):
+        return self.index.slice(n, start, stop)
+
+    def bounds(self, n):
+        # The box around what `run` draws after `n` rewrites, starting
+        # from the current state of the turtle, without drawing it.
+        state = self.turtle.state
+        return bounds.bounds(self.lsys, n, self.step_size, self.angle,
+                             state.position, state.angle)
+
+    def stream(self, n):
+        # Unlike `rewrite`, this leaves `self.prog` alone and returns the
+        # program as a generator which can be passed to `run`.
+        return derive(self.lsys.axiom, self.lsys.rules, n)
     
-    def run(self):
-        for cmd in self.prog:
-            if cmd.isupper():
-                self.turtle.forward(self.step_size)
-            elif cmd.islower():
-                self.turtle.penup()
-                self.turtle.forward(self.step_size)
-                self.turtle.pendown()
-            elif cmd == '[':
-                self.turtle.state.push()
-            elif cmd == ']':
-                self.turtle.state.pop()
-            elif cmd == '+':
-                self.turtle.left(self.angle)
-            elif cmd == '-':
-                self.turtle.right(self.angle)
+    def run(self, prog=None):
+        # The program is compiled first, so that each command is a
+        # single lookup. See `opcodes`.
+        if prog is None:
+            prog = self.prog
+        if isinstance(prog, opcodes.Runs):
+            # Long runs are carried out at once, everything else as usual
+            (handlers, repeated) = (self.handlers(), self.repeat_handlers())
+            for piece in prog.pieces():
+                if isinstance(piece, str):
+                    for op in piece:
+                        handlers[op]()
+                else:
+                    (op, k) = piece
+                    repeated[op](k)
+        else:
+            handlers = self.handlers()
+            for op in opcodes.compile(prog):
+                handlers[op]()
+        self.turtle.flush()
+
+    def handlers(self):
+        # The function carrying out each command of `opcodes`
+        turtle = self.turtle
+        return {
+            'F': partial(turtle.forward, self.step_size),
+            'f': self.move,
+            '[': turtle.state.push,
+            ']': turtle.state.pop,
+            '+': partial(turtle.left, self.angle),
+            '-': partial(turtle.right, self.angle),
+        }
+
+    def repeat_handlers(self):
+        # The function carrying out a run of `k` times each command, so
+        # that repeated steps make one move and repeated turns one turn.
+        turtle = self.turtle
+        state = turtle.state
+        def push(k):
+            for _ in xrange(k):
+                state.push()
+        def pop(k):
+            for _ in xrange(k):
+                state.pop()
+        return {
+            'F': lambda k: turtle.forward(k * self.step_size),
+            'f': lambda k: self.move(k),
+            '[': push,
+            ']': pop,
+            '+': lambda k: turtle.left(k * self.angle),
+            '-': lambda k: turtle.right(k * self.angle),
+        }
+
+    def move(self, k=1):
+        self.turtle.penup()
+        self.turtle.forward(k * self.step_size)
+        self.turtle.pendown()
+
+    def execute(self, cmd):
+        if cmd.isupper():
+            self.turtle.forward(self.step_size)
+        elif cmd.islower():
+            self.move()
+        elif cmd == '[':
+            self.turtle.state.push()
+        elif cmd == ']':
+            self.turtle.state.pop()
+        elif cmd == '+':
+            self.turtle.left(self.angle)
+        elif cmd == '-':
+            self.turtle.right(self.angle)
+        else:
+            print 'did not understand:', cmd
+
+    def subtrees(self):
+        # The net effect on the turtle of each symbol after each number
+        # of rewrites. See `subtree`.
+        if self.summaries is None or self.summaries.angle != self.angle:
+            self.summaries = Summaries(self.lsys, self.angle)
+        return self.summaries
+
+    def boxes(self):
+        # The box around what each symbol draws after each number of
+        # rewrites, for each heading the turtle can be in, or None when
+        # headings are not whole numbers of steps. See `bounds`.
+        degrees = math.degrees(self.turtle.state.angle) % 360
+        steps = turn_steps(self.angle, degrees)
+        h = degrees * steps / 360.0
+        if steps > bounds.MAX_STEPS or abs(h - round(h)) > 1e-6:
+            return None
+        e = self.extents
+        if e is None or (e.steps, e.step_size, e.angle) != \
+                        (steps, self.step_size, self.angle):
+            self.extents = bounds.Extents(self.lsys, self.step_size,
+                                          self.angle, steps)
+        return self.extents
+
+    def box(self, extents, c, n):
+        # The box around what `c` draws after `n` rewrites from the
+        # current state of the turtle, or None if it draws nothing.
+        state = self.turtle.state
+        h = int(round(state.angle * extents.steps / (2 * math.pi)))
+        box = extents.extent(c, n, h % extents.steps)[3]
+        if box is None:
+            return None
+
+        # Jumps leave the turtle off by rounding errors, which must not
+        # hide segments lying along the edge of the viewport.
+        e = 1e-6 * self.step_size
+        (x, y) = state.position
+        return (box[0] + x - e, box[1] + y - e, box[2] + x + e, box[3] + y + e)
+
+    def sketch(self, box, summary):
+        # Stands in for a subtree too small to make out with a stroke
+        # across its box, then moves the turtle to where it ends.
+        self.turtle.draw_line((box[0], box[1]), (box[2], box[3]))
+        self.jump(summary)
+
+    def jump(self, summary):
+        # Moves the turtle as `summary` says, without drawing anything
+        state = self.turtle.state
+        (x, y) = state.position
+        (dx, dy) = rotate((summary.dx * self.step_size,
+                           summary.dy * self.step_size), state.angle)
+        state.position = (x + dx, y + dy)
+        if summary.turns:
+            self.turtle.left(summary.turns * self.angle)
+
+    def interpret(self, n=None, viewport=None, detail=None):
+        """
+        Draws the same as `run` on the program after `n` rewrites, by
+        default as many as the last call to `rewrite`. The derivation is
+        walked straight from the rules, and subtrees that draw nothing
+        are jumped over in one step.
+
+        If `viewport` is given as a box (xmin, ymin, xmax, ymax), such as
+        `bounds.viewport(win)`, subtrees that draw nothing within it are
+        jumped over too, so that the time taken depends on what is
+        visible rather than on the length of the program.
+
+        If `detail` is given, subtrees whose box is smaller than `detail`
+        across are drawn as a single stroke instead. With `detail` set to
+        the size of a pixel, such as `bounds.pixel(win)`, the time taken
+        is bounded by the resolution of the window.
+        """
+        if n is None:
+            n = self.depth
+        rules = self.lsys.rules
+        summaries = self.subtrees()
+        extents = None
+        if viewport is not None or detail is not None:
+            extents = self.boxes()
+        stack = [(iter(self.lsys.axiom), n)]
+        while stack:
+            (it, depth) = stack[-1]
+            for c in it:
+                if depth > 0 and c in rules:
+                    summary = summaries.summary(c, depth)
+                    if summary is not None and not summary.draws:
+                        self.jump(summary)
+                        continue
+                    box = None
+                    if summary is not None and extents is not None:
+                        box = self.box(extents, c, depth)
+                    if box is not None and viewport is not None and \
+                       not bounds.intersects(box, viewport):
+                        self.jump(summary)
+                        continue
+                    if box is not None and detail is not None and \
+                       max(box[2] - box[0], box[3] - box[1]) < detail:
+                        self.sketch(box, summary)
+                        continue
+                    stack.append((iter(rules[c]), depth-1))
+                    break
+                self.execute(c)
             else:
-                print 'did not understand:', cmd
+                stack.pop()
+        self.turtle.flush()
+
+    def endpoint(self, n=None):
+        # Moves the turtle to where the whole program after `n` rewrites
+        # leaves it, without drawing. This takes time proportional to the
+        # length of the axiom, not of the program.
+        if n is None:
+            n = self.depth
+        summary = self.subtrees().walk(self.lsys.axiom, n)
+        if summary is None:
+            raise ValueError('unbalanced brackets')
+        self.jump(summary)
+
+    def run_vectorized(self, prog=None):
+        # The same as `run`, but the whole program is interpreted at once
+        # with NumPy and the turtle is only handed the resulting segments.
+        if prog is None:
+            prog = self.prog
+        state = self.turtle.state
+        (segments, (position, angle, stack)) = vectorize.interpret(
+            prog, self.step_size, self.angle, state.position, state.angle)
+        self.turtle.draw_segments(*segments)
+        self.turtle.flush()
+
+        # Open brackets are pushed by the state itself, which stores the
+        # heading its own way.
+        for (state.position, state.angle) in stack:
+            state.push()
+        state.position = position
+        state.angle = angle
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The opcodes module compiles a turtle program before it is run. Every
+symbol is mapped to the command it stands for, so that the interpreter
+can look each one up in a table instead of classifying it again:
+
+    F   draw a step (any uppercase letter)
+    f   move a step without drawing (any lowercase letter)
+    [   save the state of the turtle
+    ]   restore the last state saved
+    +   turn left
+    -   turn right
+
+Symbols that stand for no command are dropped from the compiled program,
+and reported once rather than every time they occur.
+
+Typical usage of this module is simply as follows:
+
+    from opcodes import compile
+
+    ops = compile(lsys.prog)
+"""
+
+import re
+import string
+from array import array
+from itertools import islice, izip
+
+from length import alphabet
+
+COMMANDS = 'Ff[]+-'
+
+# Maps every byte to the command it stands for, and lists those which
+# stand for none.
+TABLE = string.maketrans(string.ascii_uppercase + string.ascii_lowercase,
+                         'F' * 26 + 'f' * 26)
+KNOWN = string.ascii_letters + '[]+-'
+NOOPS = ''.join(chr(i) for i in xrange(256) if chr(i) not in KNOWN)
+
+# Programs that are not strings are compiled this many symbols at a time
+CHUNK = 1 << 16
+
+def unknown(prog):
+    # The symbols in `prog` which stand for no command
+    return set(prog.translate(None, KNOWN))
+
+def chunks(prog):
+    if isinstance(prog, str):
+        yield prog
+        return
+    if hasattr(prog, '__getitem__') and hasattr(prog, '__len__'):
+        # Memory maps and derivations are sliced rather than iterated
+        (i, n) = (0, len(prog))
+        while i < n:
+            chunk = prog[i:i+CHUNK]
+            if not isinstance(chunk, str):
+                chunk = ''.join(chunk)
+            yield chunk
+            i += CHUNK
+        return
+    it = iter(prog)
+    while True:
+        chunk = ''.join(islice(it, CHUNK))
+        if not chunk:
+            return
+        yield chunk
+
+def compile(prog, report=True):
+    """
+    Returns `prog` as a string of commands, after reporting the symbols
+    in it which stand for none if `report` is set. A program that is not
+    a string, such as a memory map or a generator, is compiled a chunk
+    at a time, and is returned as an iterator over its commands.
+    """
+    if isinstance(prog, str):
+        if report:
+            for c in sorted(unknown(prog)):
+                print 'did not understand:', c
+        return prog.translate(TABLE, NOOPS)
+    return compile_chunks(prog, report)
+
+def compile_chunks(prog, report):
+    reported = set()
+    for chunk in chunks(prog):
+        if report:
+            for c in sorted(unknown(chunk) - reported):
+                print 'did not understand:', c
+                reported.add(c)
+        for op in chunk.translate(TABLE, NOOPS):
+            yield op
+
+class Runs(object):
+    """
+    A compiled program in which every long run of the same command is
+    stored once with a count. `text` holds the commands, with a single
+    command standing for each long run, and `starts` and `counts` give
+    the index of each of those in `text` and the length of its run.
+    Iterating over it gives the commands one by one.
+    """
+
+    def __init__(self, text, starts, counts):
+        self.text = text
+        self.starts = starts
+        self.counts = counts
+
+    def __len__(self):
+        return len(self.text) + sum(self.counts) - len(self.counts)
+
+    def __iter__(self):
+        for piece in self.pieces():
+            if isinstance(piece, str):
+                for op in piece:
+                    yield op
+            else:
+                (op, k) = piece
+                for _ in xrange(k):
+                    yield op
+
+    def pieces(self):
+        return pieces(self.text, self.starts, self.counts)
+
+    def nbytes(self):
+        return len(self.text) + sum(c.itemsize * len(c)
+                                    for c in (self.starts, self.counts))
+
+# Runs at least this long are stored as one symbol and a count. A shorter
+# run takes no more room as it is.
+LONG = 17
+
+# Finds any long run, or the runs of any symbol in a string
+LONG_RUN = re.compile(r'(.)\1{%d,}' % (LONG - 1), re.S)
+RUN = re.compile(r'(.)\1*', re.S)
+
+def find_runs(s, symbols=None):
+    """
+    Returns the (start, end) of each long run in `s`, in order. When the
+    runs can only be of some `symbols`, each of those is sought with
+    `str.find`, which is much faster than matching `LONG_RUN` at every
+    symbol.
+    """
+    if symbols is None:
+        return [m.span() for m in LONG_RUN.finditer(s)]
+    spans = []
+    for c in symbols:
+        (run, rest) = (c * LONG, re.compile(re.escape(c) + '*'))
+        i = s.find(run)
+        while i >= 0:
+            j = rest.match(s, i + LONG).end()
+            spans.append((i, j))
+            i = s.find(run, j)
+    spans.sort()
+    return spans
+
+def runnable(rules):
+    """
+    Returns the symbols which can make a long run when every symbol of a
+    string without any is replaced by its production in `rules`. A run
+    of a symbol in the result is made of the end of a production, of
+    productions which are all that symbol, and of the start of another.
+    Only these symbols need to be sought to find the long runs again.
+    """
+    (heads, tails, wholes) = ({}, {}, {})
+    erasing = False
+    symbols = set()
+    for p in rules.values():
+        runs = [m.group() for m in RUN.finditer(p)]
+        if not runs:
+            erasing = True
+        elif len(runs) == 1:
+            wholes.setdefault(p[0], []).append(len(p))
+        else:
+            (head, tail) = (runs[0], runs[-1])
+            heads[head[0]] = max(heads.get(head[0], 0), len(head))
+            tails[tail[0]] = max(tails.get(tail[0], 0), len(tail))
+            symbols.update(r[0] for r in runs[1:-1] if len(r) >= LONG)
+    for c in set(heads) | set(tails) | set(wholes):
+        whole = wholes.get(c, [])
+        if len(whole) > 1 or max(whole or [0]) > 1 or whole and erasing:
+            # Such productions can follow each other without end
+            symbols.add(c)
+        elif heads.get(c, 0) + tails.get(c, 0) + \
+             (LONG - 1 if whole else 0) >= LONG:
+            # The only production of `c` alone is the one of a single
+            # symbol, whose runs are all short.
+            symbols.add(c)
+    return symbols
+
+def pieces(text, starts, counts):
+    # Yields the encoded symbols as strings, between tuples (c, k) for
+    # each long run of `k` times `c`.
+    i = 0
+    for (j, k) in izip(starts, counts):
+        if i < j:
+            yield text[i:j]
+        yield (text[j], k)
+        i = j + 1
+    if i < len(text):
+        yield text[i:]
+
+def split(pieces, symbols):
+    # Splits the long runs of `symbols` out of the strings among `pieces`
+    for piece in pieces:
+        if not isinstance(piece, str):
+            yield piece
+            continue
+        i = 0
+        for (j, k) in find_runs(piece, symbols):
+            yield piece[i:j]
+            yield (piece[j], k - j)
+            i = k
+        yield piece[i:]
+
+def pack(pieces, symbols=None):
+    """
+    Encodes a sequence of strings and (c, k) runs as (text, starts,
+    counts), like those of `Runs`. The strings are searched for long
+    runs, only of `symbols` if given. Runs of the same symbol that follow
+    each other are merged, and runs too short to be worth a count are
+    spelled out.
+    """
+    (text, size, last) = ([], 0, None)
+    (starts, counts) = (array('L'), array('L'))
+    for piece in split(pieces, symbols):
+        if isinstance(piece, str):
+            if last is not None:
+                # The string may carry on the run before it
+                rest = piece.lstrip(last)
+                counts[-1] += len(piece) - len(rest)
+                piece = rest
+            if piece:
+                text.append(piece)
+                size += len(piece)
+                last = None
+            continue
+        (c, k) = piece
+        if text and last is None:
+            # Or the run may carry on the string before it
+            rest = text[-1].rstrip(c)
+            k += len(text[-1]) - len(rest)
+            size -= len(text[-1]) - len(rest)
+            text[-1] = rest
+        if k < LONG:
+            text.append(c * k)
+            size += k
+            last = None
+        elif last == c:
+            counts[-1] += k
+        else:
+            text.append(c)
+            starts.append(size)
+            counts.append(k)
+            size += 1
+            last = c
+    return (''.join(text), starts, counts)
+
+def expand(rules, runs, text, starts, counts):
+    # Rewrites every symbol once. The strings between long runs are
+    # rewritten as strings, and a long run of a symbol whose production
+    # is itself a run stays a single run.
+    get = rules.__getitem__
+    for piece in pieces(text, starts, counts):
+        if isinstance(piece, str):
+            yield ''.join(map(get, piece))
+        else:
+            (c, k) = piece
+            if c in runs:
+                (d, m) = runs[c]
+                yield (d, m * k)
+            else:
+                yield rules[c] * k
+
+def rewrite(lsys, n, report=True):
+    """
+    Returns the program of `lsys` after `n` rewrites as `Runs`. Each
+    generation is kept in the same encoding, so a long run of a symbol
+    whose production is a single run, such as `F` with `F -> FF`, is
+    rewritten at once however long it is.
+    """
+    symbols = alphabet(lsys)
+    rules = dict((c, lsys.rules.get(c, c)) for c in symbols)
+    runs = dict((c, (p[0], len(p))) for (c, p) in rules.items()
+                if p and p.count(p[0]) == len(p))
+    (text, starts, counts) = pack([lsys.axiom])
+    for _ in xrange(n):
+        (text, starts, counts) = pack(expand(rules, runs,
+                                             text, starts, counts),
+                                      runnable(rules))
+
+    # The symbols are then compiled, which can merge runs further since
+    # different symbols stand for the same command.
+    if report:
+        for c in sorted(unknown(text)):
+            print 'did not understand:', c
+    def compiled():
+        for piece in pieces(text, starts, counts):
+            if isinstance(piece, str):
+                yield piece.translate(TABLE, NOOPS)
+            else:
+                (c, k) = piece
+                op = c.translate(TABLE, NOOPS)
+                if op:
+                    yield (op, k)
+    ops = dict((c, c.translate(TABLE, NOOPS)) for c in symbols)
+    return Runs(*pack(compiled(), runnable(ops)))
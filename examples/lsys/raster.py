@@ -0,0 +1,445 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The raster module is a drawing surface that needs no display. Its
+`GraphWin` has the drawing methods of the one in `graphics`, but draws
+into a NumPy array of pixels rather than onto a Tk canvas, and the result
+is saved as a PNG or PPM image. L-systems can then be rendered by batch
+jobs and benchmarks on machines without a window system.
+
+Typical usage of this module is simply as follows:
+
+    from raster import GraphWin
+    from draw import TurtleDraw
+    from lsys import LSys
+
+    win = GraphWin('Plant', 800, 800)
+    lsys = LSys(TurtleDraw(win), Plant)
+    lsys.rewrite(6)
+    lsys.run()
+    win.save('plant.png')
+
+The `Line`, `Point` and `Rectangle` objects of `graphics` are drawn into
+it as into a Tk window, and can be imported from this module as well.
+Segments can also be drawn in bulk from arrays, or from the
+`SegmentBuffer` of a turtle, without creating any objects.
+
+Nothing is drawn until the pixels are needed. Items are only recorded
+as they are created, and then rasterized in large vectorized batches.
+"""
+
+import struct
+import zlib
+from bisect import bisect_right
+from collections import OrderedDict
+
+from graphics import Line, Point, Rectangle, Transform, color_rgb
+
+# The named colors understood besides "#rgb" and "#rrggbb"
+COLORS = {
+    'black': (0, 0, 0),
+    'white': (255, 255, 255),
+    'red': (255, 0, 0),
+    'green': (0, 255, 0),
+    'blue': (0, 0, 255),
+    'yellow': (255, 255, 0),
+    'cyan': (0, 255, 255),
+    'magenta': (255, 0, 255),
+    'gray': (190, 190, 190),
+    'grey': (190, 190, 190),
+    'orange': (255, 165, 0),
+    'purple': (160, 32, 240),
+    'brown': (165, 42, 42),
+}
+
+def parse_color(color):
+    # Returns `color`, given as for Tk, as a tuple (r, g, b)
+    if color.startswith('#'):
+        digits = color[1:]
+        if len(digits) == 3:
+            digits = ''.join(c*2 for c in digits)
+        if len(digits) == 6:
+            try:
+                return tuple(int(digits[i:i+2], 16) for i in (0, 2, 4))
+            except ValueError:
+                pass
+    elif color.lower() in COLORS:
+        return COLORS[color.lower()]
+    raise ValueError('unknown color: ' + repr(color))
+
+def write_ppm(f, pixels):
+    (h, w) = pixels.shape[:2]
+    f.write('P6\n{} {}\n255\n'.format(w, h))
+    f.write(pixels.tostring())
+
+def write_png(f, pixels):
+    (h, w) = pixels.shape[:2]
+    def chunk(kind, data):
+        f.write(struct.pack('>I', len(data)))
+        f.write(kind + data)
+        f.write(struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff))
+    # Each row of 8-bit RGB pixels is preceded by its filter type, none
+    rows = ''.join('\0' + row.tostring() for row in pixels)
+    f.write('\x89PNG\r\n\x1a\n')
+    chunk('IHDR', struct.pack('>IIBBBBB', w, h, 8, 2, 0, 0, 0))
+    chunk('IDAT', zlib.compress(rows, 6))
+    chunk('IEND', '')
+
+class Batch:
+    # Segments recorded together, in window coordinates, or in world
+    # coordinates when `world` is set. Item `first + i` is made of the
+    # segments whose `index` is `i`; it is one segment for a line and four
+    # for a rectangle, whose inside may also be filled. A batch is always
+    # at least one item, even if it has no segments.
+    def __init__(self, first, x1, y1, x2, y2, rgb, width, index, fill=None,
+                 world=False):
+        self.first = first
+        self.segments = (x1, y1, x2, y2, rgb, width)
+        self.index = index
+        self.alive = np.ones(index[-1] + 1 if len(index) else 1, dtype=bool)
+        self.fill = fill
+        self.world = world
+
+try:
+    import numpy as np
+
+    def clip(x1, y1, x2, y2, xmin, ymin, xmax, ymax):
+        """
+        Clips segments to a box, by the method of Liang and Barsky.
+        Returns the clipped segments and which of the segments given
+        they are, since those entirely outside the box are dropped.
+        """
+        (dx, dy) = (x2 - x1, y2 - y1)
+        t0 = np.zeros(len(x1))
+        t1 = np.ones(len(x1))
+        outside = np.zeros(len(x1), dtype=bool)
+        for (p, q) in ((-dx, x1 - xmin), (dx, xmax - x1),
+                       (-dy, y1 - ymin), (dy, ymax - y1)):
+            outside |= (p == 0) & (q < 0)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                r = q / p
+            t0 = np.where(p < 0, np.maximum(t0, r), t0)
+            t1 = np.where(p > 0, np.minimum(t1, r), t1)
+        keep = np.flatnonzero(~outside & (t0 <= t1))
+        (t0, t1, dx, dy) = (t0[keep], t1[keep], dx[keep], dy[keep])
+        (x1, y1) = (x1[keep], y1[keep])
+        return (x1 + t0*dx, y1 + t0*dy, x1 + t1*dx, y1 + t1*dy, keep)
+
+    def rasterize(pixels, x1, y1, x2, y2, rgb, width):
+        """
+        Draws segments, given in window coordinates, into `pixels`. Each
+        segment is sampled once per pixel along its longer axis, and
+        every sample is stamped as a square `width` pixels across. Later
+        segments are drawn over earlier ones.
+        """
+        (h, w) = pixels.shape[:2]
+        pad = width.max() if len(width) else 0
+        (x1, y1, x2, y2, keep) = clip(x1, y1, x2, y2,
+                                      -pad, -pad, w - 1 + pad, h - 1 + pad)
+        if not len(keep):
+            return
+        (rgb, width) = (rgb[keep], width[keep])
+
+        # The samples of all segments, in order
+        (dx, dy) = (x2 - x1, y2 - y1)
+        n = np.ceil(np.maximum(abs(dx), abs(dy))).astype(np.int64) + 1
+        segment = np.repeat(np.arange(len(n)), n)
+        start = np.cumsum(n) - n
+        t = (np.arange(len(segment)) - start[segment]) / \
+            np.maximum(n - 1, 1)[segment].astype(float)
+        x = np.rint(x1[segment] + t*dx[segment]).astype(np.int64)
+        y = np.rint(y1[segment] + t*dy[segment]).astype(np.int64)
+        size = np.maximum(np.rint(width[segment]), 1).astype(np.int64)
+
+        for k in np.unique(size):
+            samples = np.flatnonzero(size == k)
+            for i in xrange(-((k-1) // 2), k // 2 + 1):
+                for j in xrange(-((k-1) // 2), k // 2 + 1):
+                    (sx, sy) = (x[samples] + i, y[samples] + j)
+                    inside = (sx >= 0) & (sx < w) & (sy >= 0) & (sy < h)
+                    pixels[sy[inside], sx[inside]] = \
+                        rgb[segment[samples[inside]]]
+
+    def blank(width, height, rgb):
+        pixels = np.empty((height, width, 3), dtype=np.uint8)
+        pixels[:] = rgb
+        return pixels
+
+except ImportError as error:
+    def clip(x1, y1, x2, y2, xmin, ymin, xmax, ymax):
+        raise error
+
+    def rasterize(pixels, x1, y1, x2, y2, rgb, width):
+        raise error
+
+    def blank(width, height, rgb):
+        raise error
+
+class GraphWin:
+    """
+    A window that is never shown. Items drawn into it are kept, like
+    those of a canvas, so that they can be deleted again, and are turned
+    into pixels when `getPixels` or `save` is called.
+    """
+
+    def __init__(self, title='Graphics Window', width=200, height=200,
+                 autoflush=True):
+        self.title = title
+        self.width = int(width)
+        self.height = int(height)
+        self.background = parse_color('white')
+        self.pixels = blank(self.width, self.height, self.background)
+        self.trans = None
+        self.closed = False
+
+        # Drawing objects from `graphics` would update its Tk root when
+        # this is set, so it never is. Nothing needs updating here.
+        self.autoflush = False
+
+        # Objects drawn in the window, by item, in the order they were drawn
+        self.items = OrderedDict()
+
+        # Every item ever created is in a batch, in order. Single lines
+        # are collected in `pending` until a batch is needed.
+        self.batches = []
+        self.firsts = []
+        self.pending = ([], [], [], [], [], [])
+        self.next_id = 1
+
+        # How many batches are already drawn into `pixels`
+        self.drawn = 0
+
+    def __repr__(self):
+        if self.closed:
+            return '<Closed GraphWin>'
+        return "GraphWin('{}', {}, {})".format(self.title, self.width,
+                                               self.height)
+
+    def close(self):
+        self.closed = True
+
+    def isClosed(self):
+        return self.closed
+
+    def isOpen(self):
+        return not self.closed
+
+    def getWidth(self):
+        return self.width
+
+    def getHeight(self):
+        return self.height
+
+    def getMouse(self):
+        # There is no one to click
+        return None
+
+    def checkMouse(self):
+        return None
+
+    def getKey(self):
+        return ''
+
+    def checkKey(self):
+        return ''
+
+    def update(self):
+        pass
+
+    def flush(self):
+        pass
+
+    def setBackground(self, color):
+        self.background = parse_color(color)
+        self.drawn = 0
+
+    def setCoords(self, x1, y1, x2, y2):
+        self.trans = Transform(self.width, self.height, x1, y1, x2, y2)
+        self.drawn = 0
+        self.redraw()
+
+    def toScreen(self, x, y):
+        if self.trans:
+            return self.trans.screen(x, y)
+        return x, y
+
+    def toWorld(self, x, y):
+        if self.trans:
+            return self.trans.world(x, y)
+        return x, y
+
+    def screen(self, x, y):
+        # `toScreen` for arrays of coordinates, without rounding
+        if self.trans:
+            t = self.trans
+            return ((x - t.xbase) / t.xscale, (t.ybase - y) / t.yscale)
+        return (x, y)
+
+    def addItem(self, item):
+        self.items[item.id] = item
+
+    def delItem(self, item):
+        del self.items[item.id]
+
+    def clear(self):
+        # Undraws every object in the window at once
+        self.delete('all')
+        for item in self.items.values():
+            item.canvas = None
+            item.id = None
+        self.items.clear()
+
+    def redraw(self):
+        items = list(self.items.values())
+        self.undraw_many(items)
+        self.draw_many(items)
+
+    def draw_many(self, objects):
+        # Nothing is drawn until it is needed, so drawing objects in
+        # turn is already as fast as it gets.
+        for obj in objects:
+            obj.draw(self)
+
+    def undraw_many(self, objects):
+        for obj in objects:
+            obj.undraw()
+
+    # The canvas methods used by the drawing objects
+
+    def create_line(self, x1, y1, x2, y2, options=None, **kw):
+        options = dict(options or {}, **kw)
+        (xs1, ys1, xs2, ys2, rgb, width) = self.pending
+        xs1.append(x1)
+        ys1.append(y1)
+        xs2.append(x2)
+        ys2.append(y2)
+        rgb.append(parse_color(options.get('fill') or 'black'))
+        width.append(float(options.get('width', 1)))
+        self.next_id += 1
+        return self.next_id - 1
+
+    def create_rectangle(self, x1, y1, x2, y2, options=None, **kw):
+        options = dict(options or {}, **kw)
+        self.close_pending()
+        rgb = parse_color(options.get('outline') or 'black')
+        fill = options.get('fill')
+        width = float(options.get('width', 1))
+        x = np.array([x1, x2, x2, x1], dtype=float)
+        y = np.array([y1, y1, y2, y2], dtype=float)
+        self.add(Batch(self.next_id, x, y, np.roll(x, -1), np.roll(y, -1),
+                       np.array([rgb] * 4, dtype=np.uint8),
+                       np.array([width] * 4), np.zeros(4, dtype=np.int64),
+                       (min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2),
+                        parse_color(fill)) if fill else None))
+        return self.next_id - 1
+
+    def delete(self, *ids):
+        if 'all' in ids:
+            self.batches = []
+            self.firsts = []
+            self.pending = ([], [], [], [], [], [])
+            self.drawn = 0
+            return
+        self.close_pending()
+        for i in ids:
+            k = bisect_right(self.firsts, i) - 1
+            if k >= 0:
+                batch = self.batches[k]
+                if i - batch.first < len(batch.alive):
+                    batch.alive[i - batch.first] = False
+        self.drawn = 0
+
+    # Drawing in bulk
+
+    def draw_segments(self, x1, y1, x2, y2, color='black', width=1):
+        """
+        Draws the segments from (x1, y1) to (x2, y2), given as arrays of
+        world coordinates. They all have the same color and width, and
+        are a single item. Like objects, they follow `setCoords`.
+        """
+        (x1, y1) = (np.array(x1, float), np.array(y1, float))
+        (x2, y2) = (np.array(x2, float), np.array(y2, float))
+        n = len(x1)
+        rgb = np.empty((n, 3), dtype=np.uint8)
+        rgb[:] = parse_color(color)
+        self.close_pending()
+        self.add(Batch(self.next_id, x1, y1, x2, y2, rgb,
+                       np.repeat(float(width), n), np.zeros(n, dtype=np.int64),
+                       world=True))
+        return self.next_id - 1
+
+    def draw_buffer(self, buffer):
+        """
+        Draws every segment of a `segments.SegmentBuffer`, with its own
+        color and width, as a single item.
+        """
+        (x1, y1, x2, y2, colors, widths) = buffer.arrays()
+        palette = np.array([parse_color(c) for c in buffer.palette] or
+                           np.zeros((0, 3)), dtype=np.uint8)
+        self.close_pending()
+        self.add(Batch(self.next_id, x1.astype(float), y1.astype(float),
+                       x2.astype(float), y2.astype(float), palette[colors],
+                       widths.astype(float), np.zeros(len(x1), np.int64),
+                       world=True))
+        return self.next_id - 1
+
+    def add(self, batch):
+        self.batches.append(batch)
+        self.firsts.append(batch.first)
+        self.next_id = batch.first + len(batch.alive)
+
+    def close_pending(self):
+        # Turns the single lines created so far into a batch
+        (x1, y1, x2, y2, rgb, width) = self.pending
+        if x1:
+            n = len(x1)
+            self.pending = ([], [], [], [], [], [])
+            self.batches.append(Batch(
+                self.next_id - n, np.array(x1, float), np.array(y1, float),
+                np.array(x2, float), np.array(y2, float),
+                np.array(rgb, dtype=np.uint8).reshape(n, 3),
+                np.array(width, float), np.arange(n)))
+            self.firsts.append(self.next_id - n)
+
+    # The result
+
+    def getPixels(self):
+        """
+        Returns the pixels of the window as an array of shape (height,
+        width, 3), after drawing what has been added since last time.
+        Anything deleted since then means drawing everything again.
+        """
+        self.close_pending()
+        if self.drawn == 0:
+            # Everything is drawn again, so batches with nothing left in
+            # them are dropped.
+            self.batches = [b for b in self.batches if b.alive.any()]
+            self.firsts = [b.first for b in self.batches]
+            self.pixels[:] = self.background
+        for batch in self.batches[self.drawn:]:
+            if batch.fill is not None and batch.alive[0]:
+                (x1, y1, x2, y2, rgb) = batch.fill
+                (x1, y1) = (max(int(round(x1)), 0), max(int(round(y1)), 0))
+                self.pixels[y1:int(round(y2))+1, x1:int(round(x2))+1] = rgb
+            alive = batch.alive[batch.index]
+            segments = batch.segments
+            if batch.world:
+                (x1, y1, x2, y2, rgb, width) = segments
+                segments = (self.screen(x1, y1) + self.screen(x2, y2) +
+                            (rgb, width))
+            if not alive.all():
+                segments = [column[alive] for column in segments]
+            rasterize(self.pixels, *segments)
+        self.drawn = len(self.batches)
+        return self.pixels
+
+    def save(self, filename):
+        # Saves the window as a PNG image, or as a PPM image if the name
+        # of the file ends with ".ppm".
+        pixels = self.getPixels()
+        with open(filename, 'wb') as f:
+            if filename.lower().endswith('.ppm'):
+                write_ppm(f, pixels)
+            else:
+                write_png(f, pixels)
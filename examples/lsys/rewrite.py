@@ -1,4 +1,5 @@
 from examples import Fibonacci
+from system import derive
 
 def rewrite(lsys, n):
     axiom = lsys.axiom
@@ -12,6 +13,7 @@ def rewrite(lsys, n):
 def main():
     for n in range(0, 10):
         r = rewrite(Fibonacci, n)
+        assert(''.join(derive(Fibonacci.axiom, Fibonacci.rules, n)) == r)
         print 'n =', n,
         print 'length =', len(r),
         print 'result =', r
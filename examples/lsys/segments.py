@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The segments module provides `SegmentBuffer`, a compact store for the
+line segments drawn by a turtle. Rather than one graphics object per
+segment, it keeps one flat array per column, so that a segment costs
+40 bytes (24 with single precision) and the whole drawing can be handed
+over to a backend at once:
+
+    from segments import SegmentBuffer
+
+    buffer = SegmentBuffer()
+    buffer.append(0, 0, 10, 0, '#000000', 1)
+    buffer.extend(x1, y1, x2, y2, '#000000', 1)
+    (x1, y1, x2, y2, colors, widths) = buffer.arrays()
+    palette = buffer.palette
+"""
+
+from array import array
+
+class SegmentBuffer:
+    def __init__(self, single=False):
+        # Coordinates are stored as doubles, or as floats if `single` is
+        # set. Colors are stored as indices into `palette`, which lists
+        # each distinct color once, in order of first use.
+        self.typecode = 'f' if single else 'd'
+        self.palette = []
+        self.color_index = {}
+        self.clear()
+
+    def clear(self):
+        # The `array` type grows geometrically, so appending is amortized
+        # constant time.
+        self.x1 = array(self.typecode)
+        self.y1 = array(self.typecode)
+        self.x2 = array(self.typecode)
+        self.y2 = array(self.typecode)
+        self.colors = array('I')
+        self.widths = array('f')
+
+    def __len__(self):
+        return len(self.x1)
+
+    def color(self, color):
+        # Returns the palette index of `color`, adding it if needed.
+        try:
+            return self.color_index[color]
+        except KeyError:
+            self.color_index[color] = len(self.palette)
+            self.palette.append(color)
+            return self.color_index[color]
+
+    def append(self, x1, y1, x2, y2, color, width):
+        self.x1.append(x1)
+        self.y1.append(y1)
+        self.x2.append(x2)
+        self.y2.append(y2)
+        self.colors.append(self.color(color))
+        self.widths.append(width)
+
+    def extend(self, x1, y1, x2, y2, color, width):
+        # Appends a batch of segments given as sequences of coordinates,
+        # all drawn with the same pen. NumPy arrays, such as those from
+        # `vectorize.interpret`, are copied in without a Python loop.
+        k = len(self.x1)
+        self.x1.extend(to_array(x1, self.typecode))
+        self.y1.extend(to_array(y1, self.typecode))
+        self.x2.extend(to_array(x2, self.typecode))
+        self.y2.extend(to_array(y2, self.typecode))
+        k = len(self.x1) - k
+        self.colors.extend(array('I', [self.color(color)]) * k)
+        self.widths.extend(array('f', [width]) * k)
+
+    def __iter__(self):
+        palette = self.palette
+        for segment in zip(self.x1, self.y1, self.x2, self.y2,
+                           self.colors, self.widths):
+            yield segment[:4] + (palette[segment[4]], segment[5])
+
+    def columns(self):
+        return (self.x1, self.y1, self.x2, self.y2, self.colors, self.widths)
+
+    def nbytes(self):
+        return sum(c.itemsize * len(c) for c in self.columns())
+
+    def arrays(self):
+        # Returns the columns as NumPy arrays sharing memory with the
+        # buffer. They are only valid until the next segment is added.
+        return tuple(as_numpy(c) for c in self.columns())
+
+try:
+    import numpy as np
+
+    def to_array(values, typecode):
+        # Converts NumPy arrays in bulk rather than element by element.
+        return array(typecode, np.asarray(values, dtype=typecode).tostring())
+
+    def as_numpy(column):
+        return np.frombuffer(column, dtype=column.typecode)
+
+except ImportError as error:
+    def to_array(values, typecode):
+        return array(typecode, values)
+
+    def as_numpy(column):
+        raise error
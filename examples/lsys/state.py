@@ -1,3 +1,4 @@
+from fractions import Fraction, gcd
 import math
 
 def deg2rad(n):
@@ -34,3 +35,95 @@ class TurtleState:
 
     def right(self, amount=deg2rad(90)):
         self.turn(-amount)
+
+def turn_steps(*angles):
+    # The number of equal steps in a full turn such that every one of
+    # `angles` (in degrees) is a whole number of steps. Angles are taken
+    # as fractions of a degree, so 22.5 is as good as 90.
+    # `gcd` takes the sign of its second argument, so negative angles
+    # would make the count negative.
+    unit = Fraction(360)
+    for a in angles:
+        unit = abs(gcd(unit, Fraction(a).limit_denominator(1000)))
+    steps = int(Fraction(360) / unit)
+    if steps <= 0:
+        raise ValueError('no whole number of steps for {}'.format(angles))
+    return steps
+
+def heading_table(steps):
+    # The unit step for each of `steps` equally spaced headings. Each
+    # vector is derived from an angle of at most a quarter turn and then
+    # reflected, so opposite headings cancel exactly and the axes are
+    # exact; closed curves then close however long they run.
+    table = []
+    for i in xrange(steps):
+        # Reflect into the upper half turn, then into the first quadrant
+        j = min(i, steps - i)
+        k = steps - 2*j
+        if 4*j <= steps:
+            (c, s) = (math.cos(2*math.pi*j/steps), math.sin(2*math.pi*j/steps))
+        else:
+            (c, s) = (-math.cos(math.pi*k/steps), math.sin(math.pi*k/steps))
+        if 4*j == steps:
+            (c, s) = (0.0, 1.0)
+        if i > steps - i:
+            s = -s
+        table.append((c, -s))
+    return table
+
+class DiscreteTurtleState(TurtleState, object):
+    """
+    A turtle whose heading is a whole number of steps out of `steps`
+    in a full turn. Moving reads the direction from a precomputed table
+    rather than calling `cos` and `sin`, and the heading never drifts.
+    Turns must be whole numbers of steps.
+    """
+
+    # This is a new-style class so that `angle` can be a property
+
+    def __init__(self, steps):
+        self.position = (50.0, 50.0)
+        self.stack = []
+        self.steps = steps
+        self.table = heading_table(steps)
+        self.heading = 0
+
+    def __repr__(self):
+        (x, y) = self.position
+        return 'DiscreteTurtleState(({}, {}), {}/{})'.format(
+            x, y, self.heading, self.steps)
+
+    # The heading in radians, for code written against `TurtleState`
+    def get_angle(self):
+        return 2 * math.pi * self.heading / self.steps
+
+    def set_angle(self, theta):
+        self.heading = self.to_steps(theta) % self.steps
+
+    angle = property(get_angle, set_angle)
+
+    def to_steps(self, theta):
+        k = theta * self.steps / (2 * math.pi)
+        if abs(k - round(k)) > 1e-6:
+            raise ValueError('{} radians is not a whole number of steps'
+                             .format(theta))
+        return int(round(k))
+
+    def push(self):
+        self.stack.append((self.position, self.heading))
+
+    def pop(self):
+        (self.position, self.heading) = self.stack.pop()
+
+    def forward(self, n=1):
+        (x, y) = self.position
+        (dx, dy) = self.table[self.heading]
+        self.position = (x+dx*n, y+dy*n)
+
+    def turn(self, amount=deg2rad(90)):
+        self.heading = (self.heading + self.to_steps(amount)) % self.steps
+
+    left = turn
+
+    def right(self, amount=deg2rad(90)):
+        self.turn(-amount)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The subtree module summarizes what the expansion of each symbol does to
+the turtle. Whatever the expansion of a symbol after `n` rewrites draws,
+once its brackets are matched its net effect is a turn and a
+displacement relative to the heading the turtle started with. These
+summaries are computed once per (symbol, depth) pair, so a subtree of
+the derivation can be jumped over in constant time rather than being
+walked symbol by symbol.
+
+Typical usage of this module is simply as follows:
+
+    from subtree import Summaries
+    from examples import KochIsland
+
+    summary = Summaries(KochIsland).walk(KochIsland.axiom, 12)
+    print summary.dx, summary.dy, summary.turns
+"""
+
+import math
+
+class Summary:
+    def __init__(self, dx, dy, turns, draws):
+        # The displacement is in steps, in the frame of a turtle facing
+        # along the x axis, and the turn is a number of turns by the
+        # angle of the system. `draws` tells if any segment is drawn.
+        self.dx = dx
+        self.dy = dy
+        self.turns = turns
+        self.draws = draws
+
+    def __repr__(self):
+        return 'Summary({}, {}, {}, {})'.format(self.dx, self.dy,
+                                                 self.turns, self.draws)
+
+STEP = Summary(1.0, 0.0, 0, False)
+DRAW = Summary(1.0, 0.0, 0, True)
+LEFT = Summary(0.0, 0.0, 1, False)
+RIGHT = Summary(0.0, 0.0, -1, False)
+NOTHING = Summary(0.0, 0.0, 0, False)
+
+def rotate((dx, dy), theta):
+    # Turns a displacement by `theta` radians in the direction of `left`.
+    # As in `TurtleState`, y points down the screen.
+    (c, s) = (math.cos(theta), math.sin(theta))
+    return (c*dx + s*dy, c*dy - s*dx)
+
+class Summaries:
+    def __init__(self, lsys, angle=None):
+        if angle is None:
+            angle = getattr(lsys, 'angle', 90)
+        self.lsys = lsys
+        self.angle = angle
+
+        # Maps (symbol, depth) to its summary, or to None when the
+        # brackets in its expansion do not match.
+        self.cache = {}
+
+        # The rotation for each number of turns
+        self.rotations = {}
+
+    def rotation(self, turns):
+        if turns not in self.rotations:
+            theta = math.pi * self.angle * turns / 180.0
+            self.rotations[turns] = (math.cos(theta), math.sin(theta))
+        return self.rotations[turns]
+
+    def summary(self, c, n):
+        k = (c, n)
+        if k in self.cache:
+            return self.cache[k]
+        if n > 0 and c in self.lsys.rules:
+            result = self.walk(self.lsys.rules[c], n-1)
+        elif c.isupper():
+            result = DRAW
+        elif c.islower():
+            result = STEP
+        elif c == '+':
+            result = LEFT
+        elif c == '-':
+            result = RIGHT
+        elif c in '[]':
+            result = None
+        else:
+            result = NOTHING
+        self.cache[k] = result
+        return result
+
+    def walk(self, symbols, n):
+        """
+        Returns the summary of `symbols` with each symbol rewritten `n`
+        times, or None if their brackets do not match.
+        """
+        (x, y, turns, draws) = (0.0, 0.0, 0, False)
+        stack = []
+        for c in symbols:
+            if c == '[':
+                stack.append((x, y, turns))
+            elif c == ']':
+                if not stack:
+                    return None
+                (x, y, turns) = stack.pop()
+            else:
+                s = self.summary(c, n)
+                if s is None:
+                    return None
+                (cos, sin) = self.rotation(turns)
+                x += cos*s.dx + sin*s.dy
+                y += cos*s.dy - sin*s.dx
+                turns += s.turns
+                draws = draws or s.draws
+        if stack:
+            return None
+        return Summary(x, y, turns, draws)
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The system module holds what the other modules share about L-system
+definitions themselves. A definition is any object with an `axiom`
+string and a `rules` dict mapping symbols to their productions, such as
+the classes in `examples`.
+
+Typical usage of this module is simply as follows:
+
+    from system import derive
+    from examples import Plant
+
+    for c in derive(Plant.axiom, Plant.rules, 6):
+        print c
+"""
+
+def derive(axiom, rules, n):
+    """
+    Generates the string produced by `n` applications of the production
+    rules to `axiom`, one symbol at a time.
+    """
+
+    # The expansion is walked depth-first straight from the rules, so no
+    # generation is ever built. The stack holds at most one iterator per
+    # level, each over the axiom or over the right-hand-side of a rule,
+    # which keeps memory proportional to `n`.
+    stack = [(iter(axiom), n)]
+    while stack:
+        (it, depth) = stack[-1]
+        for c in it:
+            if depth > 0 and c in rules:
+                stack.append((iter(rules[c]), depth-1))
+                break
+            yield c
+        else:
+            stack.pop()
+
+class Variant:
+    # A copy of an L-system definition whose rules can be edited. The
+    # systems in `examples` are classes shared by every user, so they
+    # are never changed in place.
+    def __init__(self, lsys):
+        self.axiom = lsys.axiom
+        self.rules = dict(lsys.rules)
+        if hasattr(lsys, 'angle'):
+            self.angle = lsys.angle
@@ -1,18 +1,21 @@
 from graphics import GraphWin
+from bounds import fit
 from draw import TurtleDraw
 from lsys import LSys
 
 from examples import *
+from state import DiscreteTurtleState, turn_steps
 
 
 def draw_lsys(win):
-    t = TurtleDraw(win)
-    t.state.position = (150, 155)
+    # Penrose only turns by multiples of 36 degrees, and we turn the
+    # turtle by 90 degrees to start, so every heading is exact.
+    t = TurtleDraw(win, DiscreteTurtleState(turn_steps(90, Penrose.angle)))
     t.state.left()
     t.set_color(40, 180, 30)
     lsys = LSys(t, Penrose)
     lsys.rewrite(6)
-    lsys.step_size = 5
+    fit(win, lsys.bounds(6))
     print 'Program:', lsys.prog
     lsys.run()
 
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The vector module writes turtle drawings to SVG or PostScript files as
+they are drawn. A sink takes the place of the segment buffer of a
+`TurtleDraw`, and joins segments that follow on from each other with
+the same pen into polylines, which are written out as soon as they are
+complete. Memory use does not grow with the drawing, so, with the
+program streamed by `LSys.interpret`, drawings of any size can be
+exported without ever creating graphics objects.
+
+Typical usage of this module is simply as follows:
+
+    from vector import SVGSink
+    from draw import TurtleDraw
+    from lsys import LSys
+
+    with SVGSink('dragon.svg') as sink:
+        lsys = LSys(TurtleDraw(None, buffer=sink), DragonCurve)
+        lsys.interpret(20)
+
+An SVG file states its size before anything is drawn, so either the
+bounding box of the drawing is given up front, for example by
+`LSys.bounds`, or the file must be seekable so that it can be filled in
+at the end. PostScript puts the bounding box at the end of the file, so
+it can be streamed anywhere. PDF is not written directly, but is easily
+made from the PostScript file with `ps2pdf -dEPSCrop`.
+"""
+
+from bounds import union
+from raster import parse_color
+
+# The most points in a polyline before it is written out anyway
+MAX_POINTS = 1 << 10
+
+def number(x):
+    return '%.10g' % x
+
+class VectorSink:
+    def __init__(self, f, box=None):
+        # `f` is a file name or an open file, and `box` is the box
+        # (xmin, ymin, xmax, ymax) around the drawing, if known.
+        self.own = isinstance(f, basestring)
+        self.f = open(f, 'wb') if self.own else f
+        self.box = box
+        self.start = self.f.tell() if self.seekable() else None
+        self.clear()
+
+    def seekable(self):
+        try:
+            self.f.tell()
+            return True
+        except (AttributeError, IOError):
+            return False
+
+    def clear(self):
+        # Starts the file over, which is only possible if it is seekable
+        # or nothing was written to it yet.
+        if hasattr(self, 'points'):
+            if self.start is None:
+                raise ValueError('cannot clear a stream')
+            self.f.seek(self.start)
+            self.f.truncate()
+        self.points = []
+        self.pen = None
+        self.extent = None
+        self.begin()
+
+    def append(self, x1, y1, x2, y2, color, width):
+        # Adds a segment, extending the current polyline if the segment
+        # starts where it ends and has the same pen.
+        p = self.points
+        pen = (color, width)
+        if not p or p[-1] != (x1, y1) or self.pen != pen or \
+           len(p) >= MAX_POINTS:
+            self.flush()
+            self.points = p = [(x1, y1)]
+            self.pen = pen
+        p.append((x2, y2))
+        self.extent = union(self.extent, (min(x1, x2), min(y1, y2),
+                                          max(x1, x2), max(y1, y2)))
+
+    def extend(self, x1, y1, x2, y2, color, width):
+        # Adds a batch of segments given as sequences of coordinates, all
+        # drawn with the same pen.
+        for (a, b, c, d) in zip(x1, y1, x2, y2):
+            self.append(a, b, c, d, color, width)
+
+    def flush(self):
+        if len(self.points) > 1:
+            (color, width) = self.pen
+            self.polyline(self.points, color, width)
+        self.points = []
+
+    def close(self):
+        self.flush()
+        self.end(self.box or self.extent or (0, 0, 0, 0))
+        if self.own:
+            self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class SVGSink(VectorSink):
+    # The size written at the start is padded to this many characters,
+    # so that it can be replaced at the end if it was not known.
+    SIZE = 200
+
+    def begin(self):
+        if self.box is None and self.start is None:
+            raise ValueError('SVG needs a box or a seekable file')
+        self.f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.size = self.f.tell() if self.box is None else None
+        self.f.write(self.header(self.box or (0, 0, 0, 0)))
+        self.f.write('<g fill="none" stroke-linecap="round" '
+                     'stroke-linejoin="round">\n')
+
+    def header(self, box):
+        (xmin, ymin, xmax, ymax) = box
+        (w, h) = (number(xmax - xmin), number(ymax - ymin))
+        size = 'width="{}" height="{}" viewBox="{} {} {} {}"'.format(
+            w, h, number(xmin), number(ymin), w, h)
+        return '<svg xmlns="http://www.w3.org/2000/svg" {}>\n'.format(
+            size.ljust(self.SIZE))
+
+    def polyline(self, points, color, width):
+        self.f.write('<polyline stroke="{}" stroke-width="{}" points="{}"/>\n'
+                     .format(color, number(float(width)),
+                             ' '.join(number(x) + ',' + number(y)
+                                      for (x, y) in points)))
+
+    def end(self, box):
+        self.f.write('</g>\n</svg>\n')
+        if self.size is not None:
+            self.f.seek(self.size)
+            self.f.write(self.header(box))
+            self.f.seek(0, 2)
+
+class PostScriptSink(VectorSink):
+    def begin(self):
+        # y points down for the turtle and up in PostScript, so the page
+        # is flipped.
+        self.f.write('%!PS-Adobe-3.0 EPSF-3.0\n'
+                     '%%BoundingBox: (atend)\n'
+                     '%%EndComments\n'
+                     '1 setlinecap 1 setlinejoin\n'
+                     '1 -1 scale\n')
+
+    def polyline(self, points, color, width):
+        (r, g, b) = parse_color(color)
+        (x, y) = points[0]
+        self.f.write('{} {} {} setrgbcolor {} setlinewidth\n'.format(
+            number(r / 255.0), number(g / 255.0), number(b / 255.0),
+            number(float(width))))
+        self.f.write('newpath {} {} moveto\n'.format(number(x), number(y)))
+        for (x, y) in points[1:]:
+            self.f.write('{} {} lineto\n'.format(number(x), number(y)))
+        self.f.write('stroke\n')
+
+    def end(self, box):
+        # The box is flipped like the page, and rounded outwards to
+        # whole points.
+        (xmin, ymin, xmax, ymax) = box
+        self.f.write('showpage\n%%Trailer\n')
+        self.f.write('%%BoundingBox: {} {} {} {}\n%%EOF\n'.format(
+            int(xmin // 1), int(-ymax // 1), -int(-xmax // 1),
+            -int(ymin // 1)))
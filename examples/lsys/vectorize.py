@@ -0,0 +1,203 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+The vectorize module interprets a turtle program with NumPy instead of
+moving the turtle one command at a time. The program is turned into
+arrays of turns and moves, headings and positions are found with
+cumulative sums, and the state restored by each `]` is resolved from the
+bracket depth of every command. The result is the start and end point
+of every drawn segment, as arrays.
+
+Typical usage of this module is simply as follows:
+
+    from vectorize import interpret
+    from lsys import LSys
+
+    lsys = LSys(turtle, Plant)
+    lsys.rewrite(7)
+    ((x1, y1, x2, y2), state) = interpret(lsys.prog, 4, 22.5)
+
+The commands are the same as those of `LSys.run`: an uppercase letter
+draws a step, a lowercase letter moves a step without drawing, `+` and
+`-` turn left and right, and `[` and `]` save and restore the state.
+Anything else is ignored.
+"""
+
+import math
+import mmap
+
+from state import deg2rad, heading_table, turn_steps
+
+try:
+    import numpy as np
+
+    # The largest heading table worth building; finer angles fall back
+    # to computing every direction.
+    MAX_STEPS = 1 << 16
+
+    # Per-byte lookup tables for each kind of command
+    TURNS = np.zeros(256, dtype=np.int64)
+    TURNS[ord('+')] = 1
+    TURNS[ord('-')] = -1
+    MOVES = np.array([chr(i).isalpha() for i in xrange(256)])
+    DRAWS = np.array([chr(i).isupper() for i in xrange(256)])
+
+    def as_codes(prog):
+        # Strings and memory maps are viewed in place, anything else that
+        # iterates over symbols is joined first.
+        if not isinstance(prog, (str, mmap.mmap)):
+            prog = ''.join(prog)
+        return np.frombuffer(prog, dtype=np.uint8)
+
+    def restore(depth, push, pop):
+        """
+        Returns a function that, given an array of per-command values such
+        as turns or displacements, returns the correction to add at each
+        `]` so that a cumulative sum undoes everything since its `[`.
+        """
+        n = len(depth)
+
+        # Pair each `]` with its `[`. Ordered by level, and by position
+        # within a level, brackets alternate between `[` and `]`, so the
+        # match of a `]` is the bracket just before it.
+        brackets = np.flatnonzero(push | pop)
+        level = np.where(push[brackets], depth[brackets], depth[brackets]+1)
+        ranked = brackets[np.argsort(level, kind='mergesort')]
+        is_pop = pop[ranked]
+        pushes = ranked[np.flatnonzero(is_pop) - 1]
+        pops = ranked[is_pop]
+
+        # Inside a bracket pair, anything nested deeper is already undone
+        # by its own `]`. So the change to undo at a `]` is the sum of the
+        # values at exactly the depth of its `[`, between the two. Those
+        # are found from prefix sums over the commands ordered by depth.
+        order = np.argsort(depth, kind='mergesort')
+        key = depth[order] * n + order
+        rank = np.empty(n, dtype=np.int64)
+        rank[order] = np.arange(n)
+        lo = rank[pushes]
+        hi = np.searchsorted(key, depth[pushes] * n + pops) - 1
+
+        def correction(values):
+            totals = np.cumsum(values[order])
+            result = np.zeros(n, dtype=totals.dtype)
+            result[pops] = totals[lo] - totals[hi]
+            return result
+
+        return (correction, pushes, pops)
+
+    def interpret(prog, step_size=4, angle=90,
+                  position=(0.0, 0.0), heading=0.0):
+        """
+        Interprets `prog` for a turtle starting at `position` with
+        `heading` in radians, turning by `angle` degrees. Returns the
+        arrays (x1, y1, x2, y2) of the drawn segments, and the final
+        (position, heading, stack) of the turtle.
+        """
+        codes = as_codes(prog)
+        n = len(codes)
+        push = codes == ord('[')
+        pop = codes == ord(']')
+
+        # The bracket depth after each command
+        depth = np.cumsum(push.astype(np.int64) - pop)
+        if n and depth.min() < 0:
+            raise IndexError('pop from empty list')
+        (correction, pushes, pops) = restore(depth, push, pop)
+
+        # Headings, as a number of turns from the initial heading
+        turns = TURNS[codes]
+        turns += correction(turns)
+        turns = np.cumsum(turns)
+        theta = heading + turns * deg2rad(angle)
+
+        # Steps are taken along the heading, with y pointing down the
+        # screen as in `TurtleState`. When both the angle and the initial
+        # heading are whole numbers of steps out of a full turn, the
+        # directions come exactly from the table of `DiscreteTurtleState`.
+        moves = MOVES[codes]
+        steps = turn_steps(angle, math.degrees(heading))
+        k = heading * steps / (2 * np.pi)
+        m = angle * steps / 360.0
+        if steps <= MAX_STEPS and abs(k - round(k)) < 1e-6 \
+           and abs(m - round(m)) < 1e-6:
+            table = step_size * np.array(heading_table(steps))
+            h = (int(round(k)) + turns * int(round(m))) % steps
+            dx = np.where(moves, table[h, 0], 0.0)
+            dy = np.where(moves, table[h, 1], 0.0)
+        else:
+            dx = np.where(moves, step_size * np.cos(theta), 0.0)
+            dy = np.where(moves, -step_size * np.sin(theta), 0.0)
+        x = position[0] + np.cumsum(dx + correction(dx))
+        y = position[1] + np.cumsum(dy + correction(dy))
+
+        # Each drawn segment runs from the position before its command
+        # to the position after it.
+        draws = np.flatnonzero(DRAWS[codes])
+        x1 = np.where(draws > 0, x[draws-1], position[0])
+        y1 = np.where(draws > 0, y[draws-1], position[1])
+        segments = (x1, y1, x[draws], y[draws])
+
+        # The final state, with a stack entry for every `[` left open
+        if n == 0:
+            return (segments, (position, heading, []))
+        closed = np.zeros(n, dtype=bool)
+        closed[pushes] = True
+        stack = [((float(x[i]), float(y[i])), float(theta[i]))
+                 for i in np.flatnonzero(push & ~closed)]
+        final = ((float(x[-1]), float(y[-1])), float(theta[-1]), stack)
+        return (segments, final)
+
+except ImportError as error:
+    def interpret(prog, step_size=4, angle=90,
+                  position=(0.0, 0.0), heading=0.0):
+        raise error
+
+#
+# Testing
+#
+
+def verify():
+    import sys
+    from draw import TurtleDraw
+    from lsys import LSys
+    from state import DiscreteTurtleState, TurtleState
+    from examples import KochIsland, Plant, Penrose, DragonCurve
+
+    sys.stdout.write('Verifying...\n')
+    sys.stdout.flush()
+
+    # Negative headings too, as left by turning right or by running a
+    # system that ends up turned clockwise.
+    for lsys in [KochIsland, Plant, Penrose, DragonCurve]:
+        for turn in [0, 90, -90, -270]:
+            for discrete in [False, True]:
+                results = []
+                for vectorized in [False, True]:
+                    if discrete:
+                        state = DiscreteTurtleState(
+                            turn_steps(getattr(lsys, 'angle', 90), 90))
+                    else:
+                        state = TurtleState()
+                    state.turn(deg2rad(turn))
+                    l = LSys(TurtleDraw(None, state), lsys)
+                    l.rewrite(3)
+                    if vectorized:
+                        l.run_vectorized(l.prog + '[F')
+                    else:
+                        l.run(l.prog + '[F')
+                    results.append((list(l.turtle.buffer), state))
+                ((a, s), (b, t)) = results
+                assert(len(a) == len(b))
+                for (p, q) in zip(a, b):
+                    assert(max(abs(u - v) for (u, v) in zip(p[:4], q[:4]))
+                           < 1e-6)
+                assert(abs(s.position[0] - t.position[0]) < 1e-6)
+                assert(abs(s.position[1] - t.position[1]) < 1e-6)
+                assert(len(s.stack) == len(t.stack) == 1)
+                s.pop()
+                t.pop()
+                assert(abs(s.angle - t.angle) < 1e-6)
+
+if __name__ == '__main__': verify()